@@ -1,12 +1,15 @@
-from typing import List
+from typing import List, Optional
 
 from src.agent.log.agent_log import AgentLog
 from src.agent.modules.core import Strategist, Runner, Critic
 from src.agent.modules.core.planner.bfs_planner import BFSPlanner
+from src.agent.modules.core.planner.budget import SearchBudget
+from src.agent.modules.core.planner.portfolio_planner import PlannerFactory
 from src.agent.modules.environment.perception.perceptor import Perceptor
 from src.agent.modules.environment.actuation.actuator import Actuator
 from src.agent.modules.nl_processor import LocalLLMClient
 from src.agent.state import Outcome, State, Action
+from src.agent.state.reference_engine import ENGINE_VERSION, reference_step
 from src.agent.modules.memory.memory import Memory
 
 
@@ -16,7 +19,23 @@ def goal_validator(trajectory: list[tuple[State, Action]], current_state: State)
 
 
 class Agent:
-    def __init__(self, baba_host_url: str, llm_host_url: str):
+    def __init__(
+        self,
+        baba_host_url: str,
+        llm_host_url: str,
+        planner_factory: Optional[PlannerFactory] = None,
+        planning_budget: Optional[SearchBudget] = None,
+        use_reference_engine: bool = False,
+    ):
+        """
+        :param planner_factory: Builds the planner from the step and goal
+            functions, e.g. a PortfolioPlanner; defaults to BFSPlanner.
+        :param planning_budget: Node, time and memory limits of each search;
+            unlimited by default.
+        :param use_reference_engine: Plan with the built-in rules engine,
+            see `reference_step`, instead of the learned step function.
+            Simulated executions still use the learned one.
+        """
         self.memory = Memory()
         self.perceptor = Perceptor(baba_host_url=baba_host_url)
         self.actuator = Actuator(baba_host_url=baba_host_url)
@@ -27,10 +46,15 @@ class Agent:
         self.critic = Critic(
             llm_client=LocalLLMClient(base_url=llm_host_url), memory=self.memory
         )
-        self.planner = BFSPlanner(
-            state_transition_function=self.runner.run,
-            goal_condition_function=goal_validator,
+        self.use_reference_engine = use_reference_engine
+        self.planner = (planner_factory or BFSPlanner)(
+            reference_step if use_reference_engine else self.runner.run,
+            goal_validator,
         )
+        if isinstance(self.planner, BFSPlanner) and not use_reference_engine:
+            # Each expansion simulates all actions of a state in one Runner call
+            self.planner.batch_transition_function = self.runner.run_batch
+        self.planning_budget = planning_budget
         #self.strategist = Strategist(
         #)  # To be integrated later
 
@@ -40,7 +64,11 @@ class Agent:
         self.prompt_counter = 0
 
     def run(
-        self, baba_map_id: int, load_stored_beliefs: bool = True, load_stored_step_function: bool = True
+        self,
+        baba_map_id: int,
+        load_stored_beliefs: bool = True,
+        load_stored_step_function: bool = True,
+        load_stored_plans: bool = True,
     ) -> List:
         print(f"Running Agent for map ID {baba_map_id}...")
         self.current_level_id = baba_map_id
@@ -50,6 +78,8 @@ class Agent:
             self.memory.load_beliefs()
         if load_stored_step_function:
             self.memory.load_step_function()
+        if load_stored_plans:
+            self.memory.load_plan_cache()
 
         while True:
             initial_state = self.perceptor.get_state()
@@ -58,7 +88,7 @@ class Agent:
                 str(self.memory.rule_beliefs)
             )
 
-            action_list = self.planner.plan(start_state=initial_state, max_depth=10)
+            action_list = self._plan(initial_state)
             real_state = self._execute_action_sequence(initial_state, action_list)
 
             if real_state.outcome == Outcome.WIN:
@@ -67,6 +97,32 @@ class Agent:
         print("Final action sequence:", action_list)
         return action_list
 
+    def _plan(self, initial_state: State) -> list[Action]:
+        """Plan from `initial_state`, reusing the plan cached for the same state and step function."""
+        step_function = ENGINE_VERSION if self.use_reference_engine else self.memory.get_step_function()
+        cached_plan = self.memory.plan_cache.get(initial_state, step_function, goal_validator)
+        if cached_plan is not None:
+            print(f"Reusing cached plan: {cached_plan}")
+            return cached_plan
+
+        result = self.planner.search(
+            start_state=initial_state, max_depth=10, budget=self.planning_budget
+        )
+        if getattr(self.planner, "winner", None):
+            print(f"Plan found by {self.planner.winner}")
+
+        action_list = result.plan
+        if result.solved:
+            self.memory.plan_cache.put(initial_state, step_function, goal_validator, action_list)
+        else:
+            # Executing the most promising partial plan surfaces belief
+            # mismatches sooner than waiting for a search that cannot succeed
+            print(f"No plan found ({result.status.value}), executing the best partial plan")
+            action_list = result.partial_plan
+            if not action_list:
+                raise Exception("Planning failed without making any progress.")
+        return action_list
+
     def _execute_action_sequence(
         self, initial_state: State, action_list: list
     ) -> State:
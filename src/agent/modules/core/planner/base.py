@@ -1,6 +1,15 @@
 from abc import ABC, abstractmethod
 from typing import Callable, Optional, List
 
+from src.agent.modules.core.planner.budget import (
+    BudgetExhausted,
+    PlanResult,
+    PlanStatus,
+    SearchBudget,
+    SearchMonitor,
+    SearchStats,
+)
+from src.agent.modules.core.planner.heuristics import Heuristic, get_heuristic
 from src.agent.state import State, Action
 
 
@@ -14,8 +23,53 @@ class Planner(ABC):
         self.state_transition_function = state_transition_function
         self.goal_condition_function = goal_condition_function
 
-    @abstractmethod
     def plan(
         self, start_state: State, max_depth: Optional[int] = None
     ) -> Optional[List[Action]]:
+        """Returns the sequence of actions to reach the goal, or None if not found."""
+        return self.search(start_state, max_depth).plan
+
+    def search(
+        self,
+        start_state: State,
+        max_depth: Optional[int] = None,
+        budget: Optional[SearchBudget] = None,
+        progress_callback: Optional[Callable[[SearchStats], None]] = None,
+    ) -> PlanResult:
+        """
+        Search for a plan within `budget`.
+
+        :param start_state: The initial State object.
+        :param max_depth: Optional depth limit to prevent infinite loops.
+        :param budget: Node, time and memory limits; unlimited by default.
+        :param progress_callback: Called with the running statistics every
+            few expansions and once more when the search ends.
+        """
+        monitor = SearchMonitor(budget, progress_callback, self._progress_heuristic())
+        try:
+            plan = self._search(start_state, max_depth, monitor)
+            status = PlanStatus.SOLVED if plan is not None else PlanStatus.EXHAUSTED
+        except BudgetExhausted as exhausted:
+            print(f"[Tactician] Search stopped: {exhausted.status.value}")
+            plan, status = None, exhausted.status
+        stats = monitor.finish()
+        return PlanResult(
+            status=status,
+            plan=plan,
+            partial_plan=plan if plan is not None else monitor.partial_plan(),
+            stats=stats,
+        )
+
+    @abstractmethod
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[List[Action]]:
+        """
+        Run the search, reporting to `monitor` every expanded and generated
+        node, and return the plan found or None.
+        """
         pass
+
+    def _progress_heuristic(self) -> Optional[Heuristic]:
+        """Heuristic ranking expanded states for the partial plan of unfinished searches."""
+        return get_heuristic("you_to_win")
@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import math
+from typing import Callable, Optional, List, Union
+
+from src.agent.modules.core.planner.base import Planner
+from src.agent.modules.core.planner.budget import SearchMonitor
+from src.agent.modules.core.planner.heuristics import Heuristic, get_heuristic
+from src.agent.modules.core.planner.search_node import SearchNode
+from src.agent.state import State, Action
+
+
+class BeamPlanner(Planner):
+    """
+    Breadth-first beam search keeping only the `beam_width` best states per depth.
+
+    Children of the current layer are ranked by the score, lower is better,
+    and only the best `beam_width` become the next layer, so memory grows at
+    most linearly with the depth instead of exponentially. States already
+    admitted at any depth are recognized by their hash and dropped. Plans are
+    neither guaranteed optimal nor found whenever one exists; when a search
+    that had to cut its beam fails, it can be restarted with a wider one.
+    """
+
+    def __init__(
+        self,
+        state_transition_function: Callable[[State, Action], State],
+        goal_condition_function: Callable[[list[tuple[State, Action]], State], bool],
+        score: Union[str, Heuristic] = "you_to_win",
+        beam_width: int = 64,
+        restarts: int = 0,
+        widening: int = 4,
+    ):
+        """
+        :param score: Name of a registered heuristic, see `register_heuristic`,
+            or any callable taking a State; states scored math.inf are pruned.
+        :param beam_width: Number of states kept per depth.
+        :param restarts: How many times a failed search is retried with a beam
+            `widening` times wider than the previous one.
+        :param widening: Factor applied to the beam width on every restart.
+        """
+        super().__init__(state_transition_function, goal_condition_function)
+        if beam_width < 1:
+            raise ValueError(f"Beam width must be at least 1, got {beam_width}")
+        self.score = get_heuristic(score)
+        self.beam_width = beam_width
+        self.restarts = restarts
+        self.widening = widening
+
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[List[Action]]:
+        """
+        Run beam searches of growing width until one finds the goal.
+        Returns the sequence of actions to reach the goal, or None if not found.
+
+        :param start_state: The initial State object.
+        :param max_depth: Optional depth limit to prevent infinite loops.
+        :param monitor: Receives the search statistics and enforces the budget.
+        """
+        print(f"[Tactician] Computing plan...")
+
+        beam_width = self.beam_width
+        for attempt in range(self.restarts + 1):
+            if attempt:
+                print(f"[Tactician] Widening beam to {beam_width}")
+            goal_node, pruned = self._search_beam(start_state, max_depth, beam_width, monitor)
+            if goal_node is not None:
+                action_list = goal_node.path()
+                print(f"[Tactician] Concluded plan: {action_list}")
+                return action_list
+            # Nothing was cut, a wider beam would search the same states again
+            if not pruned:
+                break
+            beam_width *= self.widening
+        return None
+
+    def _search_beam(
+        self, start_state: State, max_depth: Optional[int], beam_width: int, monitor: SearchMonitor
+    ) -> tuple[Optional[SearchNode], bool]:
+        """
+        One beam search of width `beam_width`.
+
+        Returns the goal node, or None, and whether any state was left out of
+        the beam for lack of room.
+        """
+        counter = itertools.count()
+        # Hashes rather than states, so that only the beams themselves hold states
+        seen: set[int] = {start_state.zobrist_hash}
+        layer: list[tuple[float, SearchNode]] = [(self.score(start_state), SearchNode(start_state))]
+        pruned = False
+
+        while layer:
+            candidates: list[tuple[float, int, SearchNode]] = []
+            for h, node in layer:
+                current_state = node.state
+                if self.goal_condition_function(node.trajectory(), current_state):
+                    return node, pruned
+                if max_depth is not None and node.depth >= max_depth:
+                    continue
+
+                monitor.on_expand(node, current_state, len(layer) + len(candidates), h)
+                for action in Action:
+                    next_state = current_state.clone()
+                    next_state = self.state_transition_function(next_state, action)
+                    monitor.on_generate()
+
+                    key = next_state.zobrist_hash
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    next_h = self.score(next_state)
+                    if next_h == math.inf:
+                        continue
+                    # The counter keeps ties in generation order and never compares nodes
+                    candidates.append((next_h, next(counter), node.child(next_state, action)))
+
+            if len(candidates) > beam_width:
+                pruned = True
+                candidates = heapq.nsmallest(beam_width, candidates)
+            layer = [(h, node) for h, _, node in candidates]
+
+        return None, pruned
@@ -1,15 +1,62 @@
-import copy
-from typing import Callable, Optional, List
+from typing import Any, Callable, Optional, List, Sequence
 from collections import deque
 
 from src.agent.modules.core.planner.base import Planner
-from src.agent.state import State, Action
+from src.agent.modules.core.planner.budget import SearchMonitor
+from src.agent.modules.core.planner.search_node import SearchNode
+from src.agent.state import State, Action, PackedState
+
+# Simulates many (state, action) pairs at once, like Runner.run_batch; the
+# result has `states` and `errors` lists aligned with the inputs
+BatchTransitionFunction = Callable[[Sequence[State], Sequence[Action]], Any]
+
+
+def expand_state(
+    state: State,
+    state_transition_function: Callable[[State, Action], State],
+    batch_transition_function: Optional[BatchTransitionFunction] = None,
+) -> list[State]:
+    """
+    Successors of `state`, one per action in Action order.
+
+    With a batch transition function, all actions go through a single call
+    of it, and only the items it failed are retried through the state
+    transition function, which gets the chance to handle their errors.
+    """
+    actions = list(Action)
+    if batch_transition_function is None:
+        return [state_transition_function(state.clone(), action) for action in actions]
+
+    result = batch_transition_function([state] * len(actions), actions)
+    return [
+        next_state if error is None else state_transition_function(state.clone(), action)
+        for action, next_state, error in zip(actions, result.states, result.errors)
+    ]
 
 
 class BFSPlanner(Planner):
 
-    def plan(
-        self, start_state: State, max_depth: Optional[int] = None
+    def __init__(
+        self,
+        state_transition_function: Callable[[State, Action], State],
+        goal_condition_function: Callable[[list[tuple[State, Action]], State], bool],
+        compact_frontier: bool = False,
+        batch_transition_function: Optional[BatchTransitionFunction] = None,
+    ):
+        """
+        :param compact_frontier: Keep queued and visited states as PackedState
+            snapshots, trading a pack per generated state and an unpack per
+            expansion for a much smaller memory footprint on large frontiers;
+            searches take roughly three times as long for a tenth of the memory.
+        :param batch_transition_function: Simulates all the actions of an
+            expanded state at once, e.g. Runner.run_batch, see `expand_state`.
+        """
+        super().__init__(state_transition_function, goal_condition_function)
+        self.compact_frontier = compact_frontier
+        self.batch_transition_function = batch_transition_function
+
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
     ) -> Optional[List[Action]]:
         """
         Performs a BFS search starting from `start_state` using the provided `actions`.
@@ -17,46 +64,55 @@ class BFSPlanner(Planner):
 
         :param start_state: The initial State object.
         :param max_depth: Optional depth limit to prevent infinite loops.
+        :param monitor: Receives the search statistics and enforces the budget.
         """
-        queue = deque()
-        visited: set[State] = set()
+        pack = PackedState.from_state if self.compact_frontier else (lambda state: state)
 
-        # Each element in queue is (current_state, path_taken)
-        queue.append((start_state, []))
-        visited.add(start_state)
+        queue: deque[SearchNode[State | PackedState]] = deque()
+        visited: set[State | PackedState] = set()
+
+        # Nodes point to their parent, the path is only rebuilt for the goal
+        root = SearchNode(pack(start_state))
+        queue.append(root)
+        visited.add(root.state)
 
         print(f"[Tactician] Computing plan...")
 
         while queue:
-            current_state, trajectory = queue.popleft()
-            action_list = [action for state, action in trajectory]
+            node = queue.popleft()
+            current_state = node.state.unpack() if self.compact_frontier else node.state
 
             # print(repr(current_state))
             # print(current_state.kind_to_properties)
-            # print("ACTIONS: " + str(action_list))
             #print("STATE: " + str(start_state))
             #print("STATE: " + str(current_state))
 
             # Check if goal reached
-            if self.goal_condition_function(trajectory, current_state):
+            if self.goal_condition_function(node.trajectory(), current_state):
+                action_list = node.path()
                 print(
                     f"[Tactician] Concluded plan: {action_list}"
                 )
-                return [action for state, action in trajectory]
+                return action_list
 
             # Depth check
-            if max_depth is not None and len(trajectory) >= max_depth:
+            if max_depth is not None and node.depth >= max_depth:
                 continue
 
+            monitor.on_expand(node, current_state, len(queue))
+
             # Explore neighbors
-            for action in Action:
-                next_state = copy.deepcopy(current_state)
-                next_state = self.state_transition_function(next_state, action)
+            successors = expand_state(
+                current_state, self.state_transition_function, self.batch_transition_function
+            )
+            for action, next_state in zip(Action, successors):
+                monitor.on_generate()
                 # print(next_state)
                 # print(next_state.kind_to_properties)
 
-                if next_state not in visited:
-                    visited.add(next_state)
-                    queue.append((next_state, trajectory + [(current_state, action)]))
+                next_key = pack(next_state)
+                if next_key not in visited:
+                    visited.add(next_key)
+                    queue.append(node.child(next_key, action))
 
         return None
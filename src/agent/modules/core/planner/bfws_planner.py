@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import math
+from typing import Callable, Optional, List, Sequence, Union
+
+from src.agent.modules.core.planner.budget import SearchMonitor
+from src.agent.modules.core.planner.heuristics import Heuristic, get_heuristic
+from src.agent.modules.core.planner.iw_planner import IWPlanner
+from src.agent.modules.core.planner.novelty import AtomIndex, NoveltyTable
+from src.agent.modules.core.planner.search_node import SearchNode
+from src.agent.state import State, Action
+
+
+class BFWSPlanner(IWPlanner):
+    """
+    Width-based planner guided by a goal-progress measure.
+
+    Modes:
+    - "bfws": Best-First Width Search. States are partitioned by the value of
+      the goal measures and the novelty of a state is computed only against
+      states of its own partition. The frontier is ordered by novelty, then by
+      the measures, and with `prune` states whose novelty exceeds `max_width`
+      are dropped, which keeps the search polynomial in the number of atoms.
+    - "siw": Serialized IW. Runs IW(1), then IW(2) and so on up to
+      `max_width`, until a state improving on the goal measures is found,
+      and chains such searches from there until the goal is reached.
+    """
+
+    MODES = ("bfws", "siw")
+
+    def __init__(
+        self,
+        state_transition_function: Callable[[State, Action], State],
+        goal_condition_function: Callable[[list[tuple[State, Action]], State], bool],
+        goal_measures: Union[str, Heuristic, Sequence[Union[str, Heuristic]]] = ("missing_rules", "you_to_win"),
+        mode: str = "bfws",
+        max_width: int = 2,
+        prune: bool = True,
+    ):
+        """
+        :param goal_measures: Registered heuristic names or callables, see
+            `register_heuristic`, compared lexicographically; lower is closer
+            to the goal and math.inf marks dead ends.
+        :param mode: One of MODES.
+        :param max_width: Largest novelty width tracked.
+        :param prune: In "bfws" mode, drop states that are not novel at any
+            width up to `max_width` instead of only deprioritizing them.
+        """
+        super().__init__(state_transition_function, goal_condition_function)
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown search mode {mode!r}, expected one of {self.MODES}")
+        if isinstance(goal_measures, str) or callable(goal_measures):
+            goal_measures = [goal_measures]
+        self.goal_measures: list[Heuristic] = [get_heuristic(measure) for measure in goal_measures]
+        self.mode = mode
+        self.max_width = max_width
+        self.prune = prune
+
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[List[Action]]:
+        """
+        Returns the sequence of actions to reach the goal, or None if not found.
+
+        :param start_state: The initial State object.
+        :param max_depth: Optional limit on the length of the whole plan.
+        :param monitor: Receives the search statistics and enforces the budget.
+        """
+        print(f"[Tactician] Computing plan...")
+        if self.mode == "siw":
+            goal_node = self._search_siw(start_state, max_depth, monitor)
+        else:
+            goal_node = self._search_bfws(start_state, max_depth, monitor)
+        if goal_node is None:
+            return None
+
+        action_list = goal_node.path()
+        print(f"[Tactician] Concluded plan: {action_list}")
+        return action_list
+
+    def _measure(self, state: State) -> tuple[float, ...]:
+        return tuple(measure(state) for measure in self.goal_measures)
+
+    def _progress_heuristic(self) -> Optional[Heuristic]:
+        # Partial plans follow the last, finest grained goal measure
+        return self.goal_measures[-1]
+
+    def _search_bfws(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[SearchNode[State]]:
+        atom_index = AtomIndex()
+        # Novelty tables of every width, one set per value of the goal measures
+        partitions: dict[tuple[float, ...], list[NoveltyTable]] = {}
+
+        def novelty(partition, atom_ids, parent_partition, parent_ids) -> int:
+            tables = partitions.get(partition)
+            if tables is None:
+                tables = partitions[partition] = [
+                    NoveltyTable(width, atom_index) for width in range(1, self.max_width + 1)
+                ]
+            # The parent's tuples are only known to be registered in its own partition
+            known = parent_ids if partition == parent_partition else None
+            result = self.max_width + 1
+            for table in tables:
+                # Every table must register the state, even once its novelty is known
+                if table.check_and_register(atom_ids, known) and table.width < result:
+                    result = table.width
+            return result
+
+        counter = itertools.count()
+        start_partition = self._measure(start_state)
+        start_ids = atom_index.ids(self._get_atoms(start_state))
+        novelty(start_partition, start_ids, None, None)
+        frontier = [((1, start_partition, 0), next(counter), SearchNode(start_state), start_partition, start_ids)]
+        seen_states = {start_state}
+
+        while frontier:
+            _, _, node, partition, atom_ids = heapq.heappop(frontier)
+            current_state = node.state
+
+            if self.goal_condition_function(node.trajectory(), current_state):
+                return node
+            if max_depth is not None and node.depth >= max_depth:
+                continue
+
+            monitor.on_expand(node, current_state, len(frontier))
+            for action in Action:
+                next_state = current_state.clone()
+                next_state = self.state_transition_function(next_state, action)
+                monitor.on_generate()
+                if next_state in seen_states:
+                    continue
+                seen_states.add(next_state)
+
+                next_partition = self._measure(next_state)
+                if math.inf in next_partition:
+                    continue
+                next_ids = atom_index.ids(self._get_atoms(next_state))
+                width = novelty(next_partition, next_ids, partition, atom_ids)
+                if self.prune and width > self.max_width:
+                    continue
+                heapq.heappush(
+                    frontier,
+                    (
+                        (width, next_partition, node.depth + 1),
+                        next(counter),
+                        node.child(next_state, action),
+                        next_partition,
+                        next_ids,
+                    ),
+                )
+
+        return None
+
+    def _search_siw(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[SearchNode[State]]:
+        node = SearchNode(start_state)
+
+        while not self.goal_condition_function(node.trajectory(), node.state):
+            current = self._measure(node.state)
+
+            # Subgoal: reach the goal, or any state improving on the goal measures
+            def is_subgoal(trajectory, state):
+                return self.goal_condition_function(trajectory, state) or self._measure(state) < current
+
+            for width in range(1, self.max_width + 1):
+                # Sub-searches hang off the previous one, so paths and depths
+                # cover the whole plan
+                subgoal_node = self._search_iw(node, width, max_depth, is_subgoal, monitor)
+                if subgoal_node is not None:
+                    break
+            else:
+                return None
+            node = subgoal_node
+
+        return node
@@ -0,0 +1,171 @@
+import math
+import os
+import resource
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Optional, List
+
+from src.agent.modules.core.planner.heuristics import Heuristic
+from src.agent.modules.core.planner.search_node import SearchNode
+from src.agent.state import Action
+
+
+class PlanStatus(Enum):
+    SOLVED = "solved"
+    # The whole search space, within the depth limit, holds no goal
+    EXHAUSTED = "exhausted"
+    NODE_LIMIT = "node_limit"
+    TIME_LIMIT = "time_limit"
+    MEMORY_LIMIT = "memory_limit"
+
+
+@dataclass
+class SearchBudget:
+    """Limits of a single search; None means unlimited."""
+
+    max_nodes: Optional[int] = None
+    # Wall-clock seconds from the start of the search
+    time_limit: Optional[float] = None
+    # Soft ceiling on the resident memory of the process, checked periodically
+    max_memory_mb: Optional[float] = None
+
+
+@dataclass
+class SearchStats:
+    expanded: int = 0
+    generated: int = 0
+    frontier: int = 0
+    max_depth_reached: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class PlanResult:
+    status: PlanStatus
+    plan: Optional[List[Action]] = None
+    # Path to the expanded state closest to the goal by the planner's
+    # heuristic, for searches that ended without a plan
+    partial_plan: List[Action] = field(default_factory=list)
+    stats: SearchStats = field(default_factory=SearchStats)
+
+    @property
+    def solved(self) -> bool:
+        return self.status == PlanStatus.SOLVED
+
+
+class BudgetExhausted(Exception):
+    def __init__(self, status: PlanStatus):
+        super().__init__(status.value)
+        self.status = status
+
+
+def _resident_memory_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # Peak rather than current usage, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+class SearchMonitor:
+    """
+    Bookkeeping shared by all planners during a search.
+
+    Planners report every expansion and generated node; the monitor keeps
+    the statistics, remembers the expanded node closest to the goal, calls
+    the progress callback every `progress_interval` expansions and raises
+    BudgetExhausted once a limit of the budget is reached.
+    """
+
+    # Reading the process memory is comparatively slow, so it is sampled
+    MEMORY_CHECK_INTERVAL = 256
+
+    def __init__(
+        self,
+        budget: Optional[SearchBudget] = None,
+        progress_callback: Optional[Callable[[SearchStats], None]] = None,
+        heuristic: Optional[Heuristic] = None,
+        progress_interval: int = 1000,
+    ):
+        self.budget = budget or SearchBudget()
+        self.progress_callback = progress_callback
+        self.heuristic = heuristic
+        self.progress_interval = progress_interval
+        self.stats = SearchStats()
+        self.best_node: Optional[SearchNode] = None
+        self._best_path: Optional[List[Action]] = None
+        self._best_h = math.inf
+        self._start = time.monotonic()
+        self._deadline = (
+            None if self.budget.time_limit is None else self._start + self.budget.time_limit
+        )
+
+    def on_expand(self, node: SearchNode, state, frontier_size: int, h: Optional[float] = None):
+        """
+        Record the expansion of `node`, whose state is `state`; may raise BudgetExhausted.
+
+        :param h: Heuristic value of the state if the planner already has it.
+        """
+        if self._record_expansion(node.depth, state, frontier_size, h):
+            self.best_node = node
+            self._best_path = None
+        self._check_budget()
+
+    def on_expand_path(self, path: List[Action], state, frontier_size: int, h: Optional[float] = None):
+        """
+        Like `on_expand`, for planners that keep the current path rather than
+        search nodes; `path` is copied only when the state is the best so far.
+        """
+        if self._record_expansion(len(path), state, frontier_size, h):
+            self.best_node = None
+            self._best_path = list(path)
+        self._check_budget()
+
+    def on_generate(self, count: int = 1):
+        self.stats.generated += count
+
+    def finish(self) -> SearchStats:
+        self.stats.elapsed = time.monotonic() - self._start
+        if self.progress_callback is not None:
+            self.progress_callback(self.stats)
+        return self.stats
+
+    def partial_plan(self) -> List[Action]:
+        if self.best_node is not None:
+            return self.best_node.path()
+        return list(self._best_path) if self._best_path is not None else []
+
+    def _record_expansion(self, depth: int, state, frontier_size: int, h: Optional[float]) -> bool:
+        """Update the statistics; returns whether `state` is the closest to the goal so far."""
+        stats = self.stats
+        stats.expanded += 1
+        stats.frontier = frontier_size
+        if depth > stats.max_depth_reached:
+            stats.max_depth_reached = depth
+
+        improved = False
+        if h is None and self.heuristic is not None:
+            h = self.heuristic(state)
+        if h is not None and h < self._best_h:
+            self._best_h = h
+            improved = True
+
+        if self.progress_callback is not None and stats.expanded % self.progress_interval == 0:
+            stats.elapsed = time.monotonic() - self._start
+            self.progress_callback(stats)
+        return improved
+
+    def _check_budget(self):
+        budget = self.budget
+        if budget.max_nodes is not None and self.stats.expanded >= budget.max_nodes:
+            raise BudgetExhausted(PlanStatus.NODE_LIMIT)
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            raise BudgetExhausted(PlanStatus.TIME_LIMIT)
+        if (
+            budget.max_memory_mb is not None
+            and self.stats.expanded % self.MEMORY_CHECK_INTERVAL == 0
+            and _resident_memory_mb() >= budget.max_memory_mb
+        ):
+            raise BudgetExhausted(PlanStatus.MEMORY_LIMIT)
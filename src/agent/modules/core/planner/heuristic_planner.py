@@ -0,0 +1,111 @@
+import heapq
+import itertools
+import math
+from typing import Callable, Optional, List, Union
+
+from src.agent.modules.core.planner.base import Planner
+from src.agent.modules.core.planner.budget import SearchMonitor
+from src.agent.modules.core.planner.heuristics import Heuristic, get_heuristic
+from src.agent.modules.core.planner.search_node import SearchNode
+from src.agent.state import State, Action
+
+
+class HeuristicPlanner(Planner):
+    """
+    Best-first planner ordering the frontier by f = g + weight * h.
+
+    Modes:
+    - "astar": weight 1, optimal plans when the heuristic never overestimates.
+    - "wastar": weighted A*, plans at most `weight` times longer than optimal
+      but found with far fewer expansions.
+    - "gbfs": greedy best-first, ordered by h alone (ties broken by depth).
+    """
+
+    MODES = ("astar", "wastar", "gbfs")
+
+    def __init__(
+        self,
+        state_transition_function: Callable[[State, Action], State],
+        goal_condition_function: Callable[[list[tuple[State, Action]], State], bool],
+        heuristic: Union[str, Heuristic] = "you_to_win",
+        mode: str = "astar",
+        weight: float = 2.0,
+    ):
+        """
+        :param heuristic: Name of a registered heuristic, see `register_heuristic`,
+            or any callable taking a State.
+        :param mode: One of MODES.
+        :param weight: Heuristic weight of "wastar", ignored by the other modes.
+        """
+        super().__init__(state_transition_function, goal_condition_function)
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown search mode {mode!r}, expected one of {self.MODES}")
+        self.heuristic = get_heuristic(heuristic)
+        self.mode = mode
+        self.weight = weight
+
+    def _priority(self, depth: int, h: float) -> tuple[float, int]:
+        if self.mode == "gbfs":
+            return h, depth
+        weight = self.weight if self.mode == "wastar" else 1
+        # Deeper nodes first among equal f, they are closer to a goal
+        return depth + weight * h, -depth
+
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[List[Action]]:
+        """
+        Search from `start_state` in order of the heuristic.
+        Returns the sequence of actions to reach the goal, or None if not found.
+
+        :param start_state: The initial State object.
+        :param max_depth: Optional depth limit to prevent infinite loops.
+        :param monitor: Receives the search statistics and enforces the budget.
+        """
+        # Entries are (priority, insertion order, node, h); the counter keeps
+        # the order stable and avoids ever comparing nodes
+        counter = itertools.count()
+        frontier: list = []
+        best_depth: dict[State, int] = {start_state: 0}
+
+        root = SearchNode(start_state)
+        start_h = self.heuristic(start_state)
+        heapq.heappush(frontier, (self._priority(0, start_h), next(counter), root, start_h))
+
+        print(f"[Tactician] Computing plan...")
+
+        while frontier:
+            _, _, node, node_h = heapq.heappop(frontier)
+            current_state = node.state
+            # Skip entries superseded by a shorter path to the same state
+            if best_depth.get(current_state, math.inf) < node.depth:
+                continue
+
+            if self.goal_condition_function(node.trajectory(), current_state):
+                action_list = node.path()
+                print(
+                    f"[Tactician] Concluded plan: {action_list}"
+                )
+                return action_list
+
+            if max_depth is not None and node.depth >= max_depth:
+                continue
+
+            monitor.on_expand(node, current_state, len(frontier), node_h)
+            for action in Action:
+                next_state = current_state.clone()
+                next_state = self.state_transition_function(next_state, action)
+                monitor.on_generate()
+
+                depth = node.depth + 1
+                if best_depth.get(next_state, math.inf) <= depth:
+                    continue
+                h = self.heuristic(next_state)
+                if h == math.inf:
+                    continue
+                best_depth[next_state] = depth
+                heapq.heappush(
+                    frontier, (self._priority(depth, h), next(counter), node.child(next_state, action), h)
+                )
+
+        return None
@@ -0,0 +1,97 @@
+import math
+from typing import Callable, Union
+
+from src.agent.state import State
+
+# A heuristic estimates the number of actions left to reach the goal; math.inf
+# marks states from which the goal cannot be reached, which are pruned.
+Heuristic = Callable[[State], float]
+
+_HEURISTICS: dict[str, Heuristic] = {}
+
+
+def register_heuristic(name: str) -> Callable[[Heuristic], Heuristic]:
+    """Decorator adding a heuristic to the registry under `name`, replacing any previous one."""
+
+    def decorator(heuristic: Heuristic) -> Heuristic:
+        _HEURISTICS[name] = heuristic
+        return heuristic
+
+    return decorator
+
+
+def get_heuristic(heuristic: Union[str, Heuristic]) -> Heuristic:
+    """Resolve a registered heuristic name; callables are returned unchanged."""
+    if callable(heuristic):
+        return heuristic
+    try:
+        return _HEURISTICS[heuristic]
+    except KeyError:
+        raise ValueError(
+            f"Unknown heuristic {heuristic!r}, registered: {sorted(_HEURISTICS)}"
+        ) from None
+
+
+def available_heuristics() -> list[str]:
+    return sorted(_HEURISTICS)
+
+
+def _blocks_with_property(state: State, property_name: str) -> list:
+    # Reads the kind index directly: `get_blocks_by_property` would give the
+    # state private copies of the blocks, which heuristics only look at.
+    # Snapshots such as PackedState have no index and use the query instead.
+    if not hasattr(state, "kind_to_blocks"):
+        return state.get_blocks_by_property(property_name)
+    return [
+        block
+        for kind in state.property_to_kinds.get(property_name, ())
+        for block in state.kind_to_blocks.get(kind, ())
+    ]
+
+
+def _blocks_of_kind(state: State, kind: str) -> list:
+    if not hasattr(state, "kind_to_blocks"):
+        return state.get_blocks_by_name(kind)
+    return state.kind_to_blocks.get(kind, [])
+
+
+def _closest_distance(sources, targets) -> float:
+    return min(
+        (abs(s.x - t.x) + abs(s.y - t.y) for s in sources for t in targets),
+        default=math.inf,
+    )
+
+
+@register_heuristic("zero")
+def zero(state: State) -> float:
+    """Blind heuristic, turns A* into uniform-cost search."""
+    return 0
+
+
+@register_heuristic("you_to_win")
+def you_to_win(state: State) -> float:
+    """
+    Manhattan distance from the closest YOU block to the closest WIN block.
+
+    Without a WIN rule, it is the distance to the closest WIN text plus one,
+    since that text has to be pushed into a rule first, and 0 if there is no
+    such text either. States without any YOU block are dead ends.
+    """
+    you_blocks = _blocks_with_property(state, "YOU")
+    if not you_blocks:
+        return math.inf
+
+    win_blocks = _blocks_with_property(state, "WIN")
+    if win_blocks:
+        return _closest_distance(you_blocks, win_blocks)
+
+    win_texts = _blocks_of_kind(state, "TEXT_WIN")
+    if win_texts:
+        return _closest_distance(you_blocks, win_texts) + 1
+    return 0
+
+
+@register_heuristic("missing_rules")
+def missing_rules(state: State) -> float:
+    """Number of the YOU and WIN rules that are not currently formed by any text."""
+    return sum(1 for property_name in ("YOU", "WIN") if not state.property_to_kinds.get(property_name))
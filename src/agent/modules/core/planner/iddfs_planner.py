@@ -0,0 +1,97 @@
+import itertools
+from typing import Optional, List
+
+from src.agent.modules.core.planner.base import Planner
+from src.agent.modules.core.planner.budget import SearchMonitor
+from src.agent.state import State, Action
+
+
+class IDDFSPlanner(Planner):
+    """
+    Iterative deepening depth-first search on a single, in-place mutated State.
+
+    Each action is applied to the one working state between `State.checkpoint`
+    and `State.rollback`, so memory stays proportional to the plan length:
+    there is no frontier, no visited set and no state copy per node. States
+    repeated along the current path are pruned, which also skips actions that
+    change nothing. Plans are shortest, like those of BFS, at the price of
+    re-expanding the shallow layers on every iteration.
+
+    Step functions that return a new state instead of mutating theirs, such as
+    one that clones first, still work; they only lose the memory savings.
+
+    Ancestor states are not kept, so the trajectory handed to the goal
+    condition pairs each action of the current path with None.
+    """
+
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[List[Action]]:
+        """
+        Run depth-limited searches with limits 0, 1, 2, ... up to `max_depth`.
+        Returns the sequence of actions to reach the goal, or None if not found.
+
+        :param start_state: The initial State object, left untouched.
+        :param max_depth: Optional depth limit; without one the search only
+            ends when an iteration is no longer cut off by its limit.
+        :param monitor: Receives the search statistics and enforces the budget.
+        """
+        state = start_state.clone()
+        path: List[Action] = []
+
+        print(f"[Tactician] Computing plan...")
+
+        limits = itertools.count() if max_depth is None else range(max_depth + 1)
+        for limit in limits:
+            found, cut_off = self._search_limited(state, limit, path, {state.zobrist_hash}, monitor)
+            if found:
+                print(
+                    f"[Tactician] Concluded plan: {path}"
+                )
+                return path
+            # Every branch ended before the limit, deeper iterations find nothing new
+            if not cut_off:
+                break
+        return None
+
+    def _search_limited(
+        self, state: State, limit: int, path: List[Action], on_path: set[int], monitor: SearchMonitor
+    ) -> tuple[bool, bool]:
+        """
+        Depth-first search below `state` to depth `limit`, extending `path` in place.
+
+        Returns (found, cut_off): whether `path` now leads to a goal, and
+        whether some branch was stopped by the limit rather than exhausted.
+        """
+        if self.goal_condition_function([(None, action) for action in path], state):
+            return True, False
+        if len(path) >= limit:
+            return False, True
+
+        monitor.on_expand_path(path, state, len(path))
+        cut_off = False
+        for action in Action:
+            state.checkpoint()
+            next_state = self.state_transition_function(state, action)
+            monitor.on_generate()
+            in_place = next_state is state
+            if not in_place:
+                # The step function built a new state, there is nothing to undo
+                state.rollback()
+
+            key = next_state.zobrist_hash
+            if key not in on_path:
+                on_path.add(key)
+                path.append(action)
+                found, child_cut_off = self._search_limited(next_state, limit, path, on_path, monitor)
+                if found:
+                    if in_place:
+                        state.commit()
+                    return True, False
+                path.pop()
+                on_path.discard(key)
+                cut_off = cut_off or child_cut_off
+
+            if in_place:
+                state.rollback()
+        return False, cut_off
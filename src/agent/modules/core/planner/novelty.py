@@ -0,0 +1,125 @@
+import itertools
+from typing import Hashable, Iterable, Optional
+
+
+class AtomIndex:
+    """Interns atoms to dense integer ids; can be shared by several novelty tables."""
+
+    def __init__(self):
+        self._ids: dict[Hashable, int] = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def ids(self, atoms: Iterable[Hashable]) -> frozenset[int]:
+        """Map atoms to their ids, interning new ones."""
+        atom_ids = self._ids
+        ids = []
+        for atom in atoms:
+            atom_id = atom_ids.get(atom)
+            if atom_id is None:
+                atom_id = atom_ids[atom] = len(atom_ids)
+            ids.append(atom_id)
+        return frozenset(ids)
+
+
+class NoveltyTable:
+    """
+    Records which tuples of atoms of size `width` have been seen by a search.
+
+    Atoms are interned to dense integer ids by an AtomIndex. Width 1 is a
+    bytearray indexed by atom id and width 2 keeps, per atom, an int used as
+    a bitset of the atoms it has been seen with; larger widths fall back to
+    a set of sorted id tuples.
+
+    When the atoms of the parent state are given, only tuples containing an
+    atom the parent did not have are enumerated: every tuple of the parent
+    was registered when the parent itself was accepted, so a check costs
+    O(changed atoms x atoms^(width-1)) instead of O(atoms^width).
+    """
+
+    def __init__(self, width: int, atom_index: Optional[AtomIndex] = None):
+        """
+        :param width: Size of the tuples whose novelty is tracked.
+        :param atom_index: Index to draw atom ids from, to share ids between
+            tables; a private one is created by default.
+        """
+        if width < 1:
+            raise ValueError(f"Novelty width must be at least 1, got {width}")
+        self.width = width
+        self.atom_index = atom_index if atom_index is not None else AtomIndex()
+        self._seen_atoms = bytearray()
+        self._seen_pairs: list[int] = []
+        self._seen_tuples: set[tuple[int, ...]] = set()
+
+    def atom_ids(self, atoms: Iterable[Hashable]) -> frozenset[int]:
+        """Map atoms to their dense ids, interning new ones."""
+        return self.atom_index.ids(atoms)
+
+    def check_and_register(
+        self, atom_ids: frozenset[int], parent_ids: Optional[frozenset[int]] = None
+    ) -> bool:
+        """
+        Register every tuple of `atom_ids` of size `width` and return whether
+        any of them was new.
+
+        :param atom_ids: Ids of the atoms of a state, see `atom_ids`.
+        :param parent_ids: Ids of the atoms of its parent, whose tuples must
+            already be registered; None registers the state from scratch.
+        """
+        changed = atom_ids if parent_ids is None else atom_ids - parent_ids
+        if not changed:
+            return False
+        # Ids may have been interned through another table sharing the index
+        missing = len(self.atom_index) - len(self._seen_atoms)
+        if missing > 0:
+            self._seen_atoms.extend(bytes(missing))
+            self._seen_pairs.extend([0] * missing)
+        if self.width == 1:
+            return self._register_atoms(changed)
+        if self.width == 2:
+            return self._register_pairs(atom_ids, changed)
+        return self._register_tuples(atom_ids, changed)
+
+    def _register_atoms(self, changed: Iterable[int]) -> bool:
+        seen = self._seen_atoms
+        is_novel = False
+        for atom_id in changed:
+            if not seen[atom_id]:
+                seen[atom_id] = 1
+                is_novel = True
+        return is_novel
+
+    def _register_pairs(self, atom_ids: frozenset[int], changed: frozenset[int]) -> bool:
+        seen = self._seen_pairs
+        # Bitset of every atom of the state, a pair is new if it adds a bit
+        # to the row of one of its changed atoms
+        state_bits = 0
+        for atom_id in atom_ids:
+            state_bits |= 1 << atom_id
+
+        is_novel = False
+        for atom_id in changed:
+            new_bits = state_bits & ~seen[atom_id] & ~(1 << atom_id)
+            if new_bits:
+                is_novel = True
+                seen[atom_id] |= new_bits
+                # Mirror the pairs into the rows of the other atoms
+                bit = 1 << atom_id
+                while new_bits:
+                    low = new_bits & -new_bits
+                    seen[low.bit_length() - 1] |= bit
+                    new_bits ^= low
+        return is_novel
+
+    def _register_tuples(self, atom_ids: frozenset[int], changed: frozenset[int]) -> bool:
+        seen = self._seen_tuples
+        is_novel = False
+        for atom_id in changed:
+            others = sorted(atom_ids - {atom_id})
+            for rest in itertools.combinations(others, self.width - 1):
+                key = tuple(sorted((atom_id, *rest)))
+                if key not in seen:
+                    seen.add(key)
+                    is_novel = True
+        return is_novel
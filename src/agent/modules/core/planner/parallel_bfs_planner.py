@@ -0,0 +1,162 @@
+import math
+import multiprocessing
+import os
+from typing import Callable, Optional, List
+
+from src.agent.modules.core.planner.bfs_planner import BFSPlanner, BatchTransitionFunction, expand_state
+from src.agent.modules.core.planner.budget import SearchMonitor
+from src.agent.modules.core.planner.search_node import SearchNode
+from src.agent.state import State, Action, PackedState
+
+# Transition functions of the current worker process, set by `_init_worker`
+_worker_step_function: Optional[Callable[[State, Action], State]] = None
+_worker_batch_function: Optional[BatchTransitionFunction] = None
+
+
+def _init_worker(
+    state_transition_function: Callable[[State, Action], State],
+    batch_transition_function: Optional[BatchTransitionFunction],
+):
+    global _worker_step_function, _worker_batch_function
+    _worker_step_function = state_transition_function
+    _worker_batch_function = batch_transition_function
+
+
+def _expand(
+    packed_state: PackedState,
+    state_transition_function: Callable[[State, Action], State],
+    batch_transition_function: Optional[BatchTransitionFunction] = None,
+) -> list[PackedState]:
+    """Children of a state, one per action in Action order."""
+    children = expand_state(packed_state.unpack(), state_transition_function, batch_transition_function)
+    return [PackedState.from_state(child) for child in children]
+
+
+def _expand_in_worker(packed_state: PackedState) -> list[PackedState]:
+    return _expand(packed_state, _worker_step_function, _worker_batch_function)
+
+
+class ParallelBFSPlanner(BFSPlanner):
+    """
+    Layer-synchronous BFS expanding each depth layer across a process pool.
+
+    Each layer is checked for the goal in queue order, then its states are
+    expanded by the workers and the children are merged back in the same
+    order, so the plan is the one serial BFS returns. States travel between
+    processes as PackedState snapshots, which are also what the visited set
+    holds and what the goal condition receives. Expanding a state in a worker
+    takes about 2.5 times the CPU of a serial expansion, for unpacking it and
+    packing and pickling its children, so the pool only pays off from three
+    or four cores on.
+
+    The pool is forked where possible, so any step function can be used;
+    with other start methods it must be picklable, see CompiledStepFunction.
+    """
+
+    def __init__(
+        self,
+        state_transition_function: Callable[[State, Action], State],
+        goal_condition_function: Callable[[list[tuple[State, Action]], State], bool],
+        workers: Optional[int] = None,
+        min_parallel_layer: int = 64,
+        batch_transition_function: Optional[BatchTransitionFunction] = None,
+        max_live_states: int = 4096,
+    ):
+        """
+        :param workers: Number of worker processes, defaults to the CPU count.
+        :param min_parallel_layer: Layers with fewer states are expanded in
+            this process, where the pool overhead would not pay off.
+        :param batch_transition_function: See BFSPlanner; workers call it too.
+        :param max_live_states: Up to this many states of a layer expanded in
+            this process are kept as States next to their snapshots, so that
+            expanding them needs no `unpack`.
+        """
+        super().__init__(
+            state_transition_function,
+            goal_condition_function,
+            compact_frontier=True,
+            batch_transition_function=batch_transition_function,
+        )
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel_layer = min_parallel_layer
+        self.max_live_states = max_live_states
+
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[List[Action]]:
+        """
+        Performs a BFS search starting from `start_state`, one depth layer at a time.
+        Returns the sequence of actions to reach the goal, or None if not found.
+
+        :param start_state: The initial State object.
+        :param max_depth: Optional depth limit to prevent infinite loops.
+        :param monitor: Receives the search statistics and enforces the budget;
+            it sees a layer's expansions once the whole layer is expanded.
+        """
+        root = SearchNode(PackedState.from_state(start_state))
+        layer: list[SearchNode[PackedState]] = [root]
+        # State of each node of the layer when this process holds it, else None
+        live_states: list[Optional[State]] = [start_state]
+        visited: set[PackedState] = {root.state}
+        pool = None
+
+        print(f"[Tactician] Computing plan...")
+
+        try:
+            while layer:
+                for node in layer:
+                    if self.goal_condition_function(node.trajectory(), node.state):
+                        action_list = node.path()
+                        print(
+                            f"[Tactician] Concluded plan: {action_list}"
+                        )
+                        return action_list
+
+                # Every node of a layer has the same depth
+                if max_depth is not None and layer[0].depth >= max_depth:
+                    return None
+
+                if self.workers > 1 and len(layer) >= self.min_parallel_layer:
+                    if pool is None:
+                        pool = self._create_pool()
+                    states = [node.state for node in layer]
+                    chunk_size = math.ceil(len(states) / (self.workers * 4))
+                    children = pool.map(_expand_in_worker, states, chunksize=chunk_size)
+                    child_states = [None] * len(layer)
+                else:
+                    child_states = [
+                        expand_state(
+                            state if state is not None else node.state.unpack(),
+                            self.state_transition_function,
+                            self.batch_transition_function,
+                        )
+                        for node, state in zip(layer, live_states)
+                    ]
+                    children = [[PackedState.from_state(child) for child in states] for states in child_states]
+
+                next_layer = []
+                live_states = []
+                for index, (node, node_children) in enumerate(zip(layer, children)):
+                    monitor.on_expand(node, node.state, len(layer) - index + len(next_layer))
+                    monitor.on_generate(len(node_children))
+                    for i, (action, child) in enumerate(zip(Action, node_children)):
+                        if child not in visited:
+                            visited.add(child)
+                            next_layer.append(node.child(child, action))
+                            live = child_states[index] is not None and len(live_states) < self.max_live_states
+                            live_states.append(child_states[index][i] if live else None)
+                layer = next_layer
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        return None
+
+    def _create_pool(self):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        return context.Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self.state_transition_function, self.batch_transition_function),
+        )
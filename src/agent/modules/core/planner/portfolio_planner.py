@@ -0,0 +1,194 @@
+import functools
+import multiprocessing
+import time
+import traceback
+from multiprocessing.connection import wait
+from typing import Callable, Optional, List
+
+from src.agent.modules.core.planner.base import Planner
+from src.agent.modules.core.planner.bfs_planner import BFSPlanner
+from src.agent.modules.core.planner.budget import PlanResult, PlanStatus, SearchBudget, SearchMonitor, SearchStats
+from src.agent.modules.core.planner.heuristic_planner import HeuristicPlanner
+from src.agent.modules.core.planner.iw_planner import IWPlanner
+from src.agent.state import State, Action
+
+# Builds a planner from the portfolio's transition and goal functions
+PlannerFactory = Callable[
+    [Callable[[State, Action], State], Callable[[list[tuple[State, Action]], State], bool]],
+    Planner,
+]
+
+DEFAULT_MEMBERS: dict[str, PlannerFactory] = {
+    "bfs": BFSPlanner,
+    "iw": IWPlanner,
+    "astar": functools.partial(HeuristicPlanner, mode="astar"),
+}
+
+
+def _run_member(
+    planner: Planner,
+    start_state: State,
+    max_depth: Optional[int],
+    budget: Optional[SearchBudget],
+    connection,
+):
+    try:
+        result = planner.search(start_state, max_depth=max_depth, budget=budget)
+    except Exception:
+        traceback.print_exc()
+        result = None
+    connection.send(result)
+    connection.close()
+
+
+class PortfolioPlanner(Planner):
+    """
+    Races several planners on the same problem, each in its own process.
+
+    The first plan found is returned and the remaining members are
+    terminated right away; the name of the member that found it is kept in
+    `winner`. Members that fail or crash are ignored while others are still
+    running. Processes are forked, so members may use any transition
+    function, but side effects they have, such as a Runner repairing its
+    step function, stay in their process.
+    """
+
+    def __init__(
+        self,
+        state_transition_function: Callable[[State, Action], State],
+        goal_condition_function: Callable[[list[tuple[State, Action]], State], bool],
+        members: Optional[dict[str, PlannerFactory]] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        :param members: Planner factories by name, called with the transition
+            and goal functions; defaults to DEFAULT_MEMBERS.
+        :param timeout: Seconds to wait for a plan before giving up.
+        """
+        super().__init__(state_transition_function, goal_condition_function)
+        self.members = dict(members if members is not None else DEFAULT_MEMBERS)
+        self.timeout = timeout
+        # Name of the member whose plan the last search returned
+        self.winner: Optional[str] = None
+
+    def search(
+        self,
+        start_state: State,
+        max_depth: Optional[int] = None,
+        budget: Optional[SearchBudget] = None,
+        progress_callback: Optional[Callable[[SearchStats], None]] = None,
+    ) -> PlanResult:
+        """
+        Runs every member on `start_state` and returns the result of the
+        first one to find a plan. Without a plan, the result of the first
+        member in configuration order that answered is returned.
+
+        :param start_state: The initial State object.
+        :param max_depth: Optional depth limit passed to every member.
+        :param budget: Budget given to each member; its time limit also
+            bounds the wait, like `timeout`.
+        :param progress_callback: Called once with the statistics of the
+            returned result; members run in other processes cannot report
+            progress.
+        """
+        self.winner = None
+        planners = {
+            name: factory(self.state_transition_function, self.goal_condition_function)
+            for name, factory in self.members.items()
+        }
+        if "fork" not in multiprocessing.get_all_start_methods():
+            result = self._search_sequentially(planners, start_state, max_depth, budget)
+        else:
+            result = self._race(planners, start_state, max_depth, budget)
+        if progress_callback is not None:
+            progress_callback(result.stats)
+        return result
+
+    def _search(
+        self, start_state: State, max_depth: Optional[int], monitor: SearchMonitor
+    ) -> Optional[List[Action]]:
+        # Members keep their own statistics, see `search`
+        return self.search(start_state, max_depth, monitor.budget).plan
+
+    def _race(
+        self,
+        planners: dict[str, Planner],
+        start_state: State,
+        max_depth: Optional[int],
+        budget: Optional[SearchBudget],
+    ) -> PlanResult:
+        context = multiprocessing.get_context("fork")
+        pending = {}
+        processes = []
+        results: dict[str, PlanResult] = {}
+        limits = [limit for limit in (self.timeout, budget and budget.time_limit) if limit is not None]
+        start = time.monotonic()
+        deadline = start + min(limits) if limits else None
+        try:
+            for name, planner in planners.items():
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_run_member,
+                    args=(planner, start_state, max_depth, budget, sender),
+                    daemon=True,
+                )
+                process.start()
+                sender.close()
+                pending[receiver] = name
+                processes.append(process)
+
+            while pending:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                ready = wait(list(pending), timeout=remaining)
+                if not ready:
+                    print(f"[Tactician] Portfolio timed out after {min(limits)}s")
+                    break
+                for receiver in ready:
+                    name = pending.pop(receiver)
+                    try:
+                        result = receiver.recv()
+                    except EOFError:
+                        # The member died without answering
+                        result = None
+                    if result is None:
+                        continue
+                    if result.solved:
+                        self.winner = name
+                        print(f"[Tactician] Portfolio plan found by {name}")
+                        return result
+                    results[name] = result
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in processes:
+                process.join()
+            for receiver in pending:
+                receiver.close()
+
+        if pending or not results:
+            # Timed out, or every member failed
+            status = PlanStatus.TIME_LIMIT if pending else PlanStatus.EXHAUSTED
+            partial = next(iter(results.values())).partial_plan if results else []
+            return PlanResult(
+                status=status,
+                partial_plan=partial,
+                stats=SearchStats(elapsed=time.monotonic() - start),
+            )
+        return results[next(name for name in planners if name in results)]
+
+    def _search_sequentially(
+        self,
+        planners: dict[str, Planner],
+        start_state: State,
+        max_depth: Optional[int],
+        budget: Optional[SearchBudget],
+    ) -> PlanResult:
+        result = None
+        for name, planner in planners.items():
+            member_result = planner.search(start_state, max_depth=max_depth, budget=budget)
+            if member_result.solved:
+                self.winner = name
+                return member_result
+            result = result or member_result
+        return result or PlanResult(status=PlanStatus.EXHAUSTED)
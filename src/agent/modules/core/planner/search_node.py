@@ -0,0 +1,86 @@
+from collections.abc import Sequence
+from typing import Optional, List, Generic, TypeVar
+
+from src.agent.state import Action
+
+S = TypeVar("S")
+
+
+class SearchNode(Generic[S]):
+    """
+    Node of a search tree that points back to its parent.
+
+    A node only stores its own state, the action that produced it and its
+    depth, so its size does not grow with the length of the path; the path
+    is rebuilt by walking the parent pointers when it is needed.
+    """
+
+    __slots__ = ("state", "parent", "action", "depth")
+
+    def __init__(self, state: S, parent: Optional["SearchNode[S]"] = None, action: Optional[Action] = None):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    def child(self, state: S, action: Action) -> "SearchNode[S]":
+        return SearchNode(state, self, action)
+
+    def path(self) -> List[Action]:
+        """Actions leading from the root to this node."""
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+    def trajectory(self) -> "Trajectory[S]":
+        """(state, action) pairs leading from the root to this node, built on first access."""
+        return Trajectory(self)
+
+    def __repr__(self):
+        return f"SearchNode(depth={self.depth}, action={self.action})"
+
+
+class Trajectory(Sequence, Generic[S]):
+    """
+    Lazy list of (state, action) pairs ending at a node, as passed to goal
+    condition functions. Its length is known without walking the tree and
+    the pairs are only collected if the goal condition looks at them.
+    """
+
+    __slots__ = ("_node", "_steps")
+
+    def __init__(self, node: SearchNode[S]):
+        self._node = node
+        self._steps: Optional[list[tuple[S, Action]]] = None
+
+    def _materialize(self) -> list[tuple[S, Action]]:
+        if self._steps is None:
+            steps = []
+            node = self._node
+            while node.parent is not None:
+                steps.append((node.parent.state, node.action))
+                node = node.parent
+            steps.reverse()
+            self._steps = steps
+        return self._steps
+
+    def __len__(self):
+        return self._node.depth
+
+    def __getitem__(self, index):
+        return self._materialize()[index]
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __eq__(self, other):
+        if isinstance(other, Trajectory):
+            other = other._materialize()
+        return self._materialize() == other
+
+    def __repr__(self):
+        return repr(self._materialize())
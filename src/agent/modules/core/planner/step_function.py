@@ -0,0 +1,28 @@
+from typing import Callable, Optional
+
+from src.agent.modules.memory.step_function_cache import step_function_cache
+from src.agent.state import State, Action
+
+
+class CompiledStepFunction:
+    """
+    Step function built from its source code, in the environment the Runner
+    executes step functions in.
+
+    The source is compiled once per process, on the first call, through the
+    shared step function cache. Only the source is pickled, so instances can
+    be sent to worker processes with any multiprocessing start method.
+    """
+
+    def __init__(self, source: str, name: str = "step"):
+        self.source = source
+        self.name = name
+        self._function: Optional[Callable[[State, Action], State]] = None
+
+    def __call__(self, state: State, action: Action) -> State:
+        if self._function is None:
+            self._function = step_function_cache.get(self.source, self.name)
+        return self._function(state, action)
+
+    def __getstate__(self):
+        return {"source": self.source, "name": self.name, "_function": None}
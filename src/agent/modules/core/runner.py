@@ -1,12 +1,13 @@
 import traceback
-from typing import Dict, Callable, Any
-from copy import deepcopy
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
 
-from src.agent.state import State, Block, Outcome
+from src.agent.state import State, Outcome
 from src.agent.state.actions import Action
 from src.agent.modules.nl_processor import LLMClient
 from src.agent.modules.nl_processor.prompts import BasePrompt
 from src.agent.modules.memory.memory import Memory
+from src.agent.modules.memory.transition_cache import TransitionCache
 from src.agent.modules.nl_processor.prompts.runner_prompt import (
     RunnerNewBeliefPrompt,
     RunnerErrorPrompt,
@@ -14,34 +15,99 @@ from src.agent.modules.nl_processor.prompts.runner_prompt import (
 )
 
 
+@dataclass
+class BatchResult:
+    """Results of `Runner.run_batch`, one list per field, aligned with the inputs."""
+
+    states: list[Optional[State]]
+    outcomes: list[Optional[Outcome]]
+    # Exception raised by the step function for the item, None if it succeeded
+    errors: list[Optional[Exception]]
+
+    def __len__(self):
+        return len(self.states)
+
+    @property
+    def failed(self) -> list[int]:
+        """Indices of the items whose step raised."""
+        return [i for i, error in enumerate(self.errors) if error is not None]
+
+
 class Runner:
-    def __init__(self, llm_client: LLMClient, memory: Memory):
+    def __init__(self, llm_client: LLMClient, memory: Memory, transition_cache_size: int = 20_000):
+        """
+        :param transition_cache_size: Number of simulated transitions remembered
+            for the current step function, see `transition_cache`.
+        """
         self.llm_client = llm_client
         self.memory = memory
+        # Replanning and belief checks simulate the same transitions again and
+        # again; hits and misses are counted by the cache
+        self.transition_cache = TransitionCache(transition_cache_size)
 
     def run(self, state: State, action: Action) -> State:
         """
         Compute the next game state given current state and an action.
         """
-        state_copy = deepcopy(state)
+        cached = self.transition_cache.get(state, action, self.memory.get_step_function_hash())
+        if cached is not None:
+            return cached
+
         while True:
             try:
-                return self._exec_step_function(state_copy, action)
+                # Fresh copy per attempt, a failed step may have half-mutated it
+                next_state = self._exec_step_function(state.clone(), action)
+                break
             except Exception as e:
                 self._handle_step_function_error(e)
 
+        # Errors replace the step function, the result belongs to the latest one
+        self.transition_cache.put(state, action, self.memory.get_step_function_hash(), next_state)
+        return next_state
+
+    def run_batch(self, states: Sequence[State], actions: Sequence[Action]) -> BatchResult:
+        """
+        Compute the next game state of every (state, action) pair at once.
+
+        The step function and its version are looked up once for the whole
+        batch, and transitions already simulated come from the transition
+        cache. Unlike `run`, errors do not trigger a step function update:
+        they are isolated to their item and reported in `BatchResult.errors`,
+        leaving it to the caller to retry through `run`.
+        """
+        if len(states) != len(actions):
+            raise ValueError(f"Got {len(states)} states but {len(actions)} actions")
+        step_hash = self.memory.get_step_function_hash()
+        cache = self.transition_cache
+
+        try:
+            step_func = self.memory.get_compiled_step_function()
+        except Exception as e:
+            # The source itself is broken, no item can be simulated
+            return BatchResult([None] * len(states), [None] * len(states), [e] * len(states))
+
+        next_states: list[Optional[State]] = []
+        outcomes: list[Optional[Outcome]] = []
+        errors: list[Optional[Exception]] = []
+        for state, action in zip(states, actions):
+            error = None
+            try:
+                next_state = cache.get(state, action, step_hash)
+                if next_state is None:
+                    next_state = step_func(state.clone(), action)
+                    cache.put(state, action, step_hash, next_state)
+            except Exception as e:
+                next_state, error = None, e
+            next_states.append(next_state)
+            outcomes.append(next_state.outcome if next_state is not None else None)
+            errors.append(error)
+        return BatchResult(next_states, outcomes, errors)
+
     def _exec_step_function(self, state: State, action: Action) -> State:
         """
-        Dynamically execute the current step function stored in memory.
+        Execute the current step function stored in memory, compiled once per version.
         """
-        local_env: Dict[str, Any] = {
-            "State": State,
-            "Block": Block,
-            "Action": Action,
-            "Outcome": Outcome,
-        }
-        exec(self.memory.get_step_function(), local_env)
-        step_func: Callable[[State, Action], State] = local_env["step"]
+        step_func: Callable[[State, Action], State] = self.memory.get_compiled_step_function()
         return step_func(state, action)
 
     def _handle_step_function_error(self, exception: Exception) -> None:
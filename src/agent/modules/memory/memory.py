@@ -1,6 +1,9 @@
 import os
 import json
-from typing import Any
+from typing import Any, Optional
+
+from src.agent.modules.memory.plan_cache import PlanCache
+from src.agent.modules.memory.step_function_cache import StepFunction, step_function_cache, step_function_hash
 
 
 _default_step_function = """
@@ -25,20 +28,38 @@ class Memory:
 
         self.rule_beliefs: dict[str, Any] = {}
         self.step_function: str = _default_step_function
+        # Compiled form and hash of step_function, dropped whenever the source changes
+        self._compiled_step_function: Optional[StepFunction] = None
+        self._step_function_hash: Optional[str] = None
 
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_dir = os.path.join(base_dir, "data")
         self.beliefs_path = os.path.join(self.data_dir, "beliefs.json")
         self.step_function_path = os.path.join(self.data_dir, "step_function.py")
+        self.plan_cache_path = os.path.join(self.data_dir, "plan_cache.json")
 
         os.makedirs(self.data_dir, exist_ok=True)  # Make sure the folder exists
 
+        self.plan_cache = PlanCache(self.plan_cache_path)
+
     def get_rule_beliefs(self) -> dict[str, Any]:
         return self.rule_beliefs
 
     def get_step_function(self) -> str:
         return self.step_function
 
+    def get_compiled_step_function(self) -> StepFunction:
+        """Return the current step function, compiled once per source."""
+        if self._compiled_step_function is None:
+            self._compiled_step_function = step_function_cache.get(self.step_function)
+        return self._compiled_step_function
+
+    def get_step_function_hash(self) -> str:
+        """Return the hash identifying the current version of the step function."""
+        if self._step_function_hash is None:
+            self._step_function_hash = step_function_hash(self.step_function)
+        return self._step_function_hash
+
     def add_rule_beliefs(self, rule_beliefs: dict[str, Any]) -> None:
         lowercased_beliefs = {k.lower(): v for k, v in rule_beliefs.items()}
         self.rule_beliefs |= lowercased_beliefs
@@ -46,6 +67,8 @@ class Memory:
 
     def replace_step_function(self, step_function: str) -> None:
         self.step_function = step_function
+        self._compiled_step_function = None
+        self._step_function_hash = None
         self._save_step_function()
 
         # ---------------------- Persistence ----------------------
@@ -74,3 +97,9 @@ class Memory:
         if os.path.exists(self.step_function_path):
             with open(self.step_function_path, "r", encoding="utf-8") as f:
                 self.step_function = f.read()
+            self._compiled_step_function = None
+            self._step_function_hash = None
+
+    def load_plan_cache(self) -> None:
+        """Load plan_cache.json if it exists"""
+        self.plan_cache.load()
@@ -0,0 +1,83 @@
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from src.agent.modules.memory.step_function_cache import step_function_hash
+from src.agent.state import State, Action
+
+
+def goal_validator_id(goal_validator: Callable) -> str:
+    """Stable name of a goal validator, independent of the process it was loaded in."""
+    module = getattr(goal_validator, "__module__", None) or ""
+    name = getattr(goal_validator, "__qualname__", None) or repr(goal_validator)
+    return f"{module}.{name}" if module else name
+
+
+class PlanCache:
+    """
+    Persistent LRU cache of plans, keyed by the start state, the version of
+    the step function and the goal validator.
+
+    Start states are identified by their Zobrist hash, which only depends on
+    the block layout and is identical across runs. Entries are stored as
+    JSON, with actions by name, and the least recently used entries are
+    dropped beyond `max_entries`. The file is written when entries are added
+    or cleared; the recency of lookups is saved along with the next write.
+    """
+
+    def __init__(self, path: str, max_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list[str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(state: State, step_function: str, goal_validator: Callable) -> str:
+        return f"{state.zobrist_hash:016x}:{step_function_hash(step_function)}:{goal_validator_id(goal_validator)}"
+
+    def get(self, state: State, step_function: str, goal_validator: Callable) -> Optional[list[Action]]:
+        """Return the cached plan, or None."""
+        key = self.key(state, step_function, goal_validator)
+        plan = self._entries.get(key)
+        if plan is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return [Action[name] for name in plan]
+
+    def put(self, state: State, step_function: str, goal_validator: Callable, plan: list[Action]) -> None:
+        key = self.key(state, step_function, goal_validator)
+        self._entries[key] = [action.name for action in plan]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.save()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------------------- Persistence ----------------------
+
+    def save(self) -> None:
+        """Save the entries, least recently used first."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(list(self._entries.items()), f)
+
+    def load(self) -> None:
+        """Load the cache file if it exists."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except json.JSONDecodeError:
+            print("[Memory] Warning: plan cache is corrupted, starting empty.")
+            return
+        self._entries = OrderedDict((key, plan) for key, plan in entries[-self.max_entries:])
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Any, Callable
+
+from src.agent.state import State, Block, Action, Outcome
+from src.agent.state.step_helpers import HELPERS
+
+
+StepFunction = Callable[[State, Action], State]
+
+
+def step_function_hash(step_function: str) -> str:
+    """Stable hash of step function source code."""
+    return sha256(step_function.encode("utf-8")).hexdigest()[:16]
+
+
+def step_function_globals() -> dict[str, Any]:
+    """Fresh copy of the names step function source code can use without importing them."""
+    return {
+        "State": State,
+        "Block": Block,
+        "Action": Action,
+        "Outcome": Outcome,
+        **HELPERS,
+    }
+
+
+def compile_step_function(source: str, name: str = "step") -> StepFunction:
+    """Execute step function source code and return the function called `name` it defines."""
+    local_env = step_function_globals()
+    exec(compile(source, f"<step_function {step_function_hash(source)}>", "exec"), local_env)
+    return local_env[name]
+
+
+class StepFunctionCache:
+    """
+    LRU cache of compiled step functions, keyed by a hash of their source.
+
+    Compiling and executing the source is far slower than a call of the
+    function it defines, so every user of a given source should go through
+    the shared `step_function_cache` instance and pay for it only once.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._functions: OrderedDict[tuple[str, str], StepFunction] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source: str, name: str = "step") -> StepFunction:
+        """Return the function `name` defined by `source`, compiling it on first use."""
+        key = (step_function_hash(source), name)
+        function = self._functions.get(key)
+        if function is not None:
+            self.hits += 1
+            self._functions.move_to_end(key)
+            return function
+
+        self.misses += 1
+        # Nothing is cached if the source does not compile or run
+        function = self._functions[key] = compile_step_function(source, name)
+        while len(self._functions) > self.max_entries:
+            self._functions.popitem(last=False)
+        return function
+
+    def clear(self) -> None:
+        self._functions.clear()
+
+    def __len__(self):
+        return len(self._functions)
+
+
+step_function_cache = StepFunctionCache()
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Optional
+
+from src.agent.state import State, Action
+
+
+class TransitionCache:
+    """
+    In-memory LRU cache of simulated transitions for one step function version.
+
+    Entries are keyed by the Zobrist hash and size of the state, the rules
+    and pending text changes it carries, its outcome and the action. The
+    resulting states are kept as copy-on-write clones, which share their
+    unchanged rows and cells with the states they came from, so that a hit
+    costs a clone rather than a rebuild. Every entry belongs to the step
+    function whose hash is `step_function_hash`; using the cache with
+    another hash empties it first.
+    """
+
+    def __init__(self, max_entries: int = 20_000):
+        self.max_entries = max_entries
+        self.step_function_hash: Optional[str] = None
+        self._entries: OrderedDict[tuple, State] = OrderedDict()
+        self._rules: dict[frozenset, frozenset] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, state: State, action: Action) -> tuple:
+        # Rules are part of the key because step functions may leave them stale
+        # after moving text; their compiled masks ignore the order of the rules
+        rules = frozenset(state.kind_property_masks.items())
+        # Interned, so that entries with the same rules share one copy
+        rules = self._rules.setdefault(rules, rules)
+        return (
+            state.zobrist_hash,
+            len(state.grid),
+            len(state.grid[0]),
+            rules,
+            state.dirty_text_cells or None,
+            state.outcome,
+            action,
+        )
+
+    def get(self, state: State, action: Action, step_function_hash: str) -> Optional[State]:
+        """Return a fresh copy of the cached successor of `state`, or None."""
+        self._use_step_function(step_function_hash)
+        key = self.key(state, action)
+        cached = self._entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return cached.clone()
+
+    def put(self, state: State, action: Action, step_function_hash: str, next_state: State) -> None:
+        self._use_step_function(step_function_hash)
+        key = self.key(state, action)
+        self._entries[key] = next_state.clone()
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._rules.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _use_step_function(self, step_function_hash: str) -> None:
+        if step_function_hash != self.step_function_hash:
+            self.clear()
+            self.step_function_hash = step_function_hash
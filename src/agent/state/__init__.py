@@ -2,5 +2,6 @@ from src.agent.state.state import State
 from src.agent.state.actions import Action
 from src.agent.state.outcomes import Outcome
 from src.agent.state.block import Block
+from src.agent.state.packed_state import PackedState
 
-__all__ = ["State", "Block", "Action", "Outcome"]
+__all__ = ["State", "Block", "Action", "Outcome", "PackedState"]
@@ -1,6 +1,10 @@
+from src.agent.state.block_type import kinds
+
+
 class Block:
     def __init__(self, kind: str, x: int, y: int):
         self.kind = kind  # e.g., "BABA", "WALL", "FLAG"
+        self.kind_id = kinds.id_of(kind)  # interned id of `kind`, see KindRegistry
         self.x = x
         self.y = y
 
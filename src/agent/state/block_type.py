@@ -1,3 +1,5 @@
+from typing import Optional
+
 # Nouns: all the noun kinds and their TEXT_ variants
 block_types = [
     "algae",
@@ -189,3 +191,93 @@ property_types = [
 def noun_references_to(noun: str) -> str:
 
     return noun.removeprefix("TEXT_")
+
+
+# -------------------------------
+# Kind registry
+# -------------------------------
+
+# Category flags of a kind; a kind can have several of them
+NOUN = 1  # an object kind, e.g. "BABA"
+TEXT_NOUN = 2  # a text naming an object kind, e.g. "TEXT_BABA"
+VERB = 4  # e.g. "TEXT_IS"
+PROPERTY = 8  # e.g. "TEXT_YOU"
+TEXT = 16  # any "TEXT_*" kind, these are always pushable
+
+
+class KindRegistry:
+    """
+    Interns kind names (upper-cased, as used by State) into small integer ids.
+
+    The kinds listed above get ids in a fixed order together with their
+    category flags; unknown kinds, such as renamed ones, are interned on first
+    use with only the TEXT flag derived from their name. For every text kind
+    the registry also precomputes the id of the kind or property it refers to.
+    """
+
+    def __init__(self):
+        self._names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._flags: list[int] = []
+        self._references: list[int] = []
+
+        for names, flag in (
+            (block_types, NOUN),
+            (noun_types, TEXT_NOUN),
+            (verb_types, VERB),
+            (property_types, PROPERTY),
+        ):
+            for name in names:
+                kind_id = self.id_of(name.upper())
+                self._flags[kind_id] |= flag
+
+    def id_of(self, name: str) -> int:
+        """Return the id of `name`, interning it if it was never seen."""
+        kind_id = self._ids.get(name)
+        if kind_id is None:
+            kind_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._flags.append(TEXT if name.startswith("TEXT_") else 0)
+            self._references.append(kind_id)
+            if name.startswith("TEXT_"):
+                self._references[kind_id] = self.id_of(noun_references_to(name))
+        return kind_id
+
+    def get(self, name: str) -> Optional[int]:
+        """Return the id of `name` without interning it, or None if unknown."""
+        return self._ids.get(name)
+
+    def name_of(self, kind_id: int) -> str:
+        return self._names[kind_id]
+
+    def flags_of(self, kind_id: int) -> int:
+        return self._flags[kind_id]
+
+    def references_to(self, kind_id: int) -> int:
+        """Id of the kind or property a text refers to ("TEXT_BABA" -> "BABA")."""
+        return self._references[kind_id]
+
+    def __len__(self):
+        return len(self._names)
+
+
+kinds = KindRegistry()
+
+TEXT_IS = kinds.id_of("TEXT_IS")
+
+
+def property_mask(*property_names: str) -> int:
+    """
+    Bitmask with one bit per property, as used by State's property masks.
+
+    Property bits are the kind ids of the property names, so nouns used as
+    properties ("ROCK IS BABA") get a bit as well. Names are not interned:
+    unknown ones, which no rule can refer to, contribute no bit.
+    """
+    mask = 0
+    for name in property_names:
+        kind_id = kinds.get(name)
+        if kind_id is not None:
+            mask |= 1 << kind_id
+    return mask
+
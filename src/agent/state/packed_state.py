@@ -0,0 +1,237 @@
+import sys
+from array import array
+from bisect import bisect_left
+
+from src.agent.state.block import Block
+from src.agent.state.block_type import kinds, property_mask
+from src.agent.state.outcomes import Outcome
+from src.agent.state.state import State
+
+# Each block is stored as one unsigned int: (cell index << _KIND_BITS) | kind id
+_KIND_BITS = 12
+_KIND_MASK = (1 << _KIND_BITS) - 1
+
+
+def _packable_kind_id(block: Block) -> int:
+    if block.kind_id > _KIND_MASK:
+        raise ValueError(f"Too many distinct kinds to pack, cannot pack {block.kind!r}")
+    return block.kind_id
+
+
+# Rule dicts are interned, so states with the same rules share one copy
+_RuleTable = tuple[dict[str, list[str]], dict[str, list[str]], dict[int, int]]
+_rule_tables: dict[tuple, _RuleTable] = {}
+
+
+def _intern_rules(state: State) -> _RuleTable:
+    key = tuple((kind, tuple(props)) for kind, props in state.kind_to_properties.items())
+    rules = _rule_tables.get(key)
+    if rules is None:
+        rules = _rule_tables[key] = (
+            state.kind_to_properties,
+            state.property_to_kinds,
+            state.kind_property_masks,
+        )
+    return rules
+
+
+def _unpickle(width, height, kind_names, cells, outcome, kind_to_properties, property_to_kinds, dirty, state_hash):
+    # Kind ids depend on the interning order of each process, so pickles name
+    # the kinds they use; cells are only re-encoded if this process's ids differ
+    ids = {kind_id: kinds.id_of(name) for kind_id, name in kind_names.items()}
+    if any(kind_id != local_id for kind_id, local_id in ids.items()):
+        cells = array("I", sorted((entry & ~_KIND_MASK) | ids[entry & _KIND_MASK] for entry in cells))
+    key = tuple((kind, tuple(props)) for kind, props in kind_to_properties.items())
+    rules = _rule_tables.get(key)
+    if rules is None:
+        # Properties may name kinds that only the pickling process has interned
+        for props in kind_to_properties.values():
+            for prop in props:
+                kinds.id_of(prop)
+        masks = {kinds.id_of(kind): property_mask(*props) for kind, props in kind_to_properties.items()}
+        rules = _rule_tables[key] = (kind_to_properties, property_to_kinds, masks)
+    return PackedState(width, height, cells, outcome, rules, dirty, state_hash)
+
+
+class PackedState:
+    """
+    Compact, read-only snapshot of a State.
+
+    Blocks are stored as a sorted array of (cell, kind id) integers, with
+    nothing allocated for empty cells, and rules are shared between all
+    snapshots that have the same ones. It answers the same queries as State
+    and can be turned back into a mutable State with `unpack`, which makes it
+    suited for holding large search frontiers and visited sets in memory.
+    """
+
+    __slots__ = ("width", "height", "cells", "outcome", "_rules", "_dirty_text_cells", "_hash")
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        cells: array,
+        outcome: Outcome,
+        rules: _RuleTable,
+        dirty_text_cells: tuple[tuple[int, int], ...],
+        state_hash: int,
+    ):
+        self.width = width
+        self.height = height
+        self.cells = cells
+        self.outcome = outcome
+        self._rules = rules
+        self._dirty_text_cells = dirty_text_cells
+        self._hash = state_hash
+
+    # -------------------------------
+    # Conversion
+    # -------------------------------
+
+    @classmethod
+    def from_state(cls, state: State) -> "PackedState":
+        """Pack a State, keeping its rules and outcome as they currently are."""
+        height = len(state.grid[0])
+        entries: list[int] = []
+        for blocks in state.kind_to_blocks.values():
+            # Kind lists are never left empty, and share the kind id of their first block
+            kind_id = _packable_kind_id(blocks[0])
+            entries.extend(((b.x * height + b.y) << _KIND_BITS) | kind_id for b in blocks)
+        entries.sort()
+        cells = array("I", entries)
+        return cls(
+            width=len(state.grid),
+            height=height,
+            cells=cells,
+            outcome=state.outcome,
+            rules=_intern_rules(state),
+            dirty_text_cells=tuple(state.dirty_text_cells),
+            state_hash=state.zobrist_hash,
+        )
+
+    def unpack(self) -> State:
+        """Rebuild a mutable State equal to the packed one."""
+        height = self.height
+        grid: list[list[list[Block]]] = [[[] for _ in range(height)] for _ in range(self.width)]
+        kind_to_blocks: dict[str, list[Block]] = {}
+        # Entries are sorted by cell, so blocks are indexed in grid order as State does
+        for entry in self.cells:
+            x, y = divmod(entry >> _KIND_BITS, height)
+            block = Block(kinds.name_of(entry & _KIND_MASK), x, y)
+            grid[x][y].append(block)
+            kind_to_blocks.setdefault(block.kind, []).append(block)
+
+        # Restore the rules as they were, even if the step function never
+        # refreshed them after moving text; pending text changes stay pending.
+        return State._restore(
+            grid, kind_to_blocks, self._hash, self._rules, self._dirty_text_cells, self.outcome
+        )
+
+    # -------------------------------
+    # Queries
+    # -------------------------------
+
+    def get_blocks_in_cell(self, x, y) -> list[Block]:
+        """Return all blocks in a specific grid cell."""
+        cell = x * self.height + y
+        start = bisect_left(self.cells, cell << _KIND_BITS)
+        end = bisect_left(self.cells, (cell + 1) << _KIND_BITS, start)
+        return [Block(kinds.name_of(entry & _KIND_MASK), x, y) for entry in self.cells[start:end]]
+
+    def get_blocks_by_name(self, block_name: str) -> list[Block]:
+        """Return all blocks of the specified kind."""
+        kind_id = kinds.get(block_name)
+        if kind_id is None:
+            return []
+        blocks = []
+        for entry in self.cells:
+            if entry & _KIND_MASK == kind_id:
+                x, y = divmod(entry >> _KIND_BITS, self.height)
+                blocks.append(Block(block_name, x, y))
+        return blocks
+
+    def get_blocks_by_property(self, property_name: str) -> list[Block]:
+        """Return all blocks (instances) that have the given property."""
+        kinds = self._rules[1].get(property_name, [])
+        return [block for kind in kinds for block in self.get_blocks_by_name(kind)]
+
+    def get_properties_of_block(self, block: Block) -> list[str]:
+        return self._rules[0].get(block.kind, [])
+
+    def has_property(self, block: Block, property_name: str) -> bool:
+        return bool(self._rules[2].get(block.kind_id, 0) & property_mask(property_name))
+
+    def get_property_mask(self, block: Block) -> int:
+        return self._rules[2].get(block.kind_id, 0)
+
+    def cell_property_mask(self, x: int, y: int) -> int:
+        if not self.in_bounds(x, y):
+            return 0
+        mask = 0
+        for block in self.get_blocks_in_cell(x, y):
+            mask |= self._rules[2].get(block.kind_id, 0)
+        return mask
+
+    def cell_has_property(self, x: int, y: int, property_name: str) -> bool:
+        return bool(self.cell_property_mask(x, y) & property_mask(property_name))
+
+    def blocks_at_with_property(self, x: int, y: int, property_name: str) -> list[Block]:
+        if not self.in_bounds(x, y):
+            return []
+        return [b for b in self.get_blocks_in_cell(x, y) if self.has_property(b, property_name)]
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    @property
+    def kind_to_properties(self) -> dict[str, list[str]]:
+        return self._rules[0]
+
+    @property
+    def property_to_kinds(self) -> dict[str, list[str]]:
+        return self._rules[1]
+
+    @property
+    def kind_property_masks(self) -> dict[int, int]:
+        return self._rules[2]
+
+    # -------------------------------
+    # Identity
+    # -------------------------------
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PackedState)
+            and self._hash == other._hash
+            and self.width == other.width
+            and self.height == other.height
+            and self.cells == other.cells
+        )
+
+    def __hash__(self):
+        return self._hash
+
+    @property
+    def zobrist_hash(self) -> int:
+        return self._hash
+
+    def __repr__(self):
+        return f"PackedState({self.width}x{self.height}, {len(self.cells)} blocks, {self.outcome.name})"
+
+    def __reduce__(self):
+        kind_ids = {entry & _KIND_MASK for entry in self.cells}
+        return _unpickle, (
+            self.width,
+            self.height,
+            {kind_id: kinds.name_of(kind_id) for kind_id in kind_ids},
+            self.cells,
+            self.outcome,
+            self._rules[0],
+            self._rules[1],
+            self._dirty_text_cells,
+            self._hash,
+        )
+
+    def nbytes(self) -> int:
+        """Memory owned by this snapshot, excluding the shared rule tables."""
+        return sys.getsizeof(self) + sys.getsizeof(self.cells) + sys.getsizeof(self._dirty_text_cells)
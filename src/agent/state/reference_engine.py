@@ -0,0 +1,216 @@
+"""
+Built-in step function implementing the core rules of Baba Is You.
+
+`reference_step` has the signature of the step functions the Runner
+executes and can be handed to any planner in their place. It works on the
+indexes of State instead of scanning the grid, and serves as an oracle to
+check learned step functions against, see `first_divergence`.
+
+Covered: YOU movement with PUSH chains blocked by STOP and the grid edge,
+OPEN/SHUT, noun IS noun transformations, SINK, HOT/MELT, DEFEAT and WIN.
+Other properties, and rules whose subject is the TEXT noun, are ignored.
+
+Each turn runs in this order: movement, rule refresh, transformations,
+destructions (SINK, then HOT/MELT, then DEFEAT, then overlapping OPEN/SHUT),
+rule refresh, outcome. The outcome is WIN when a YOU block shares a cell
+with a WIN block, LOSE when no YOU block is left and ONGOING otherwise.
+"""
+from typing import Callable, Optional, Sequence
+
+from src.agent.state.actions import Action
+from src.agent.state.block import Block
+from src.agent.state.block_type import kinds, property_mask, NOUN
+from src.agent.state.outcomes import Outcome
+from src.agent.state.state import State
+from src.agent.state.step_helpers import DIRECTIONS
+
+# Identifies this engine where a step function version is expected, e.g. as
+# the step function of plan cache keys; bump it when the rules change.
+ENGINE_VERSION = "reference_engine:2"
+
+_STOP = property_mask("STOP")
+_PUSH = property_mask("PUSH")
+_WIN = property_mask("WIN")
+_HOT = property_mask("HOT")
+_DEFEAT = property_mask("DEFEAT")
+_OPEN = property_mask("OPEN")
+_SHUT = property_mask("SHUT")
+# Property bits of the nouns, set by "K IS N" transformation rules
+_NOUNS = property_mask(*(kinds.name_of(i) for i in range(len(kinds)) if kinds.flags_of(i) & NOUN))
+
+
+def reference_step(state: State, action: Action) -> State:
+    """Apply `action` to `state` in place and return it."""
+    # The outcome is that of this turn, not one left over from a previous step
+    state.outcome = Outcome.ONGOING
+    dx, dy = DIRECTIONS[action]
+    if dx or dy:
+        _move_you(state, dx, dy)
+    # Both refreshes only re-parse the rule lines through text that changed
+    state.refresh_rules()
+    _transform(state)
+    _destroy(state)
+    state.refresh_rules()
+
+    you_blocks = state.get_blocks_by_property("YOU")
+    if not you_blocks:
+        state.outcome = Outcome.LOSE
+    elif any(state.cell_property_mask(b.x, b.y) & _WIN for b in you_blocks):
+        state.outcome = Outcome.WIN
+    return state
+
+
+def first_divergence(
+    step_function: Callable[[State, Action], State], start_state: State, actions: Sequence[Action]
+) -> Optional[int]:
+    """
+    Replay `actions` with `step_function` and with the reference engine.
+
+    Returns the index of the first action after which the two disagree on
+    the block layout or the outcome, or None if they agree throughout.
+    """
+    expected = start_state.clone()
+    actual = start_state.clone()
+    for i, action in enumerate(actions):
+        expected = reference_step(expected, action)
+        actual = step_function(actual, action)
+        if actual != expected or actual.outcome != expected.outcome:
+            return i
+    return None
+
+
+# -------------------------------
+# Movement
+# -------------------------------
+
+def _move_you(state: State, dx: int, dy: int):
+    """Move every YOU block one cell, each pushing the PUSH blocks ahead of it."""
+    masks = state.kind_property_masks
+    moved: set[int] = set()
+    for you in state.get_blocks_by_property("YOU"):
+        if id(you) in moved:
+            continue
+        # Blocks moving together, grouped by cell from the YOU block onwards
+        chain = [[you]]
+        x, y = you.x + dx, you.y + dy
+        while True:
+            if not state.in_bounds(x, y):
+                chain = None
+                break
+            mask = state.cell_property_mask(x, y)
+            if not mask & (_STOP | _PUSH):
+                break
+            cell = state.get_blocks_in_cell(x, y)
+            # A block that is both STOP and PUSH gets pushed
+            stoppers = [b for b in cell if masks.get(b.kind_id, 0) & (_STOP | _PUSH) == _STOP]
+            if stoppers:
+                _open_shut(state, chain[-1], stoppers)
+                chain = None
+                break
+            chain.append([b for b in cell if masks.get(b.kind_id, 0) & _PUSH])
+            x, y = x + dx, y + dy
+
+        if chain is None:
+            continue
+        # Front to back, so that no block is moved into a cell before it is vacated
+        for group in reversed(chain):
+            for block in group:
+                state.move_block(block, block.x + dx, block.y + dy)
+                moved.add(id(block))
+
+
+def _open_shut(state: State, movers: list[Block], stoppers: list[Block]):
+    """Destroy a mover and a stopper when one of them is OPEN and the other SHUT."""
+    masks = state.kind_property_masks
+    for mover in movers:
+        mover_mask = masks.get(mover.kind_id, 0)
+        for stopper in stoppers:
+            stopper_mask = masks.get(stopper.kind_id, 0)
+            if (mover_mask & _OPEN and stopper_mask & _SHUT) or (mover_mask & _SHUT and stopper_mask & _OPEN):
+                state.remove_block(mover)
+                state.remove_block(stopper)
+                return
+
+
+# -------------------------------
+# Transformations
+# -------------------------------
+
+def _transform(state: State) -> bool:
+    """Replace the blocks of every kind K with the kinds N of the rules "K IS N"; returns whether any changed."""
+    # Collected first, so that "BABA IS ROCK" and "ROCK IS BABA" swap instead of undoing each other
+    transformations = []
+    for kind_id, mask in state.kind_property_masks.items():
+        # "K IS K" keeps K from turning into anything else
+        if not mask & _NOUNS or mask >> kind_id & 1:
+            continue
+        kind = kinds.name_of(kind_id)
+        if kind not in state.kind_to_blocks:
+            continue
+        targets = [
+            f"TEXT_{kind}" if prop == "TEXT" else prop
+            for prop in state.kind_to_properties[kind]
+            if kinds.flags_of(kinds.id_of(prop)) & NOUN
+        ]
+        transformations.append((state.get_blocks_by_name(kind), targets))
+
+    for blocks, targets in transformations:
+        for block in blocks:
+            state.remove_block(block)
+            for target in targets:
+                state.add_block(Block(target, block.x, block.y))
+    return bool(transformations)
+
+
+# -------------------------------
+# Destruction
+# -------------------------------
+
+def _cells_with(state: State, property_name: str) -> set[tuple[int, int]]:
+    return {
+        (b.x, b.y)
+        for kind in state.property_to_kinds.get(property_name, ())
+        for b in state.kind_to_blocks.get(kind, ())
+    }
+
+
+def _any_block_with(state: State, property_name: str) -> bool:
+    return any(kind in state.kind_to_blocks for kind in state.property_to_kinds.get(property_name, ()))
+
+
+def _destroy(state: State) -> bool:
+    """Apply SINK, HOT/MELT, DEFEAT and overlapping OPEN/SHUT; returns whether any block was destroyed."""
+    destroyed = False
+
+    for x, y in _cells_with(state, "SINK"):
+        # Read through the grid, copying the cell is only worth it when it sinks
+        if len(state.grid[x][y]) > 1:
+            for block in list(state.get_blocks_in_cell(x, y)):
+                state.remove_block(block)
+            destroyed = True
+
+    # Victims are usually far fewer than their killers, e.g. one YOU block among many DEFEAT ones
+    for victim, killer, killer_name in (("MELT", _HOT, "HOT"), ("YOU", _DEFEAT, "DEFEAT")):
+        if not _any_block_with(state, killer_name):
+            continue
+        for x, y in _cells_with(state, victim):
+            if state.cell_property_mask(x, y) & killer:
+                for block in state.blocks_at_with_property(x, y, victim):
+                    state.remove_block(block)
+                    destroyed = True
+
+    if not _any_block_with(state, "OPEN"):
+        return destroyed
+    for x, y in _cells_with(state, "SHUT"):
+        if not state.cell_property_mask(x, y) & _OPEN:
+            continue
+        shut = state.blocks_at_with_property(x, y, "SHUT")
+        opened = [
+            b for b in state.blocks_at_with_property(x, y, "OPEN") if all(b is not s for s in shut)
+        ]
+        for shut_block, open_block in zip(shut, opened):
+            state.remove_block(shut_block)
+            state.remove_block(open_block)
+            destroyed = True
+
+    return destroyed
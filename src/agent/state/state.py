@@ -1,22 +1,66 @@
+import os
+import struct
+from hashlib import blake2b
+from typing import Optional
+
 from src.agent.state.block import Block
 from src.agent.state.outcomes import Outcome
-from src.agent.state.block_type import (
-    noun_references_to,
-    block_types,
-    noun_types,
-    verb_types,
-    property_types,
-)
+from src.agent.state.block_type import kinds, property_mask, TEXT, TEXT_IS, TEXT_NOUN, PROPERTY
+
+_HASH_MASK = (1 << 64) - 1
+
+# Undo journal entry tags, see `State.checkpoint`
+_UNDO_ADD, _UNDO_MOVE, _UNDO_REMOVE = range(3)
+_zobrist_keys: dict[tuple[int, int, int], int] = {}
+
+
+def _zobrist_key(kind_id: int, x: int, y: int) -> int:
+    """Stable 64-bit key of a block, identical across processes and runs."""
+    key = _zobrist_keys.get((kind_id, x, y))
+    if key is None:
+        # Derived from the kind name, since ids of unknown kinds depend on interning order
+        digest = blake2b(f"{kinds.name_of(kind_id)}:{x}:{y}".encode(), digest_size=8).digest()
+        key = _zobrist_keys[(kind_id, x, y)] = int.from_bytes(digest, "little")
+    return key
 
 
 class State:
+    # When enabled, every mutation cross-checks the incrementally maintained
+    # indexes against a full recomputation from the grid.
+    debug_indexes: bool = os.getenv("BABA_STATE_DEBUG", "") == "1"
+    # Empty cells kept around the occupied cells in `active_region`, so that
+    # everything a single action can reach stays inside it.
+    ACTIVE_REGION_PADDING: int = 1
+
     def __init__(self, grid):
         self.grid: list[list[list[Block]]] = grid
         self.kind_to_blocks: dict[str, list[Block]] = self._compute_kind_to_blocks()
+        self._hash: int = self._compute_hash()
+        self._canonical_key: Optional[tuple] = None
+        # Inclusive (x_min, y_min, x_max, y_max) of the occupied cells, None until computed
+        self._bounds: Optional[tuple[int, int, int, int]] = self._compute_bounds()
+        self._rule_lines = self._compute_rule_lines()
+        self._dirty_text_cells: set[tuple[int, int]] = set()
         self.kind_to_properties: dict[str, list[str]] = self._compute_kind_to_properties()
         self.property_to_kinds: dict[str, list[str]] = self._compute_property_to_kinds()
+        # Compiled form of kind_to_properties: kind id -> bitmask of property ids
+        self.kind_property_masks: dict[int, int] = self._compute_kind_property_masks()
+        # Lazily filled cache of cell_property_mask, keyed by (x, y)
+        self._cell_masks: dict[tuple[int, int], int] = {}
+        self._owns_cell_masks = True
         self.outcome = Outcome.ONGOING
 
+        # Copy-on-write bookkeeping, see `clone`. A freshly built state owns
+        # everything it references, so no ownership checks are needed.
+        self._cow = False
+        self._owned_rows: set[int] = set()
+        self._owned_cells: set[tuple[int, int]] = set()
+        self._owned_kind_lists: set[str] = set()
+
+        # Undo journal, only recorded between `checkpoint` and `rollback`/`commit`
+        self._journal: Optional[list[tuple]] = None
+        self._checkpoints: list[tuple] = []
+
     # -------------------------------
     # Construction and Representation
     # -------------------------------
@@ -26,48 +70,223 @@ class State:
         """Create a State from a formatted grid string."""
         lines = grid_str.strip().splitlines()
 
-        header_parts = [p.strip() for p in lines[0].split("|")]
-        y_labels = header_parts[1:]
-        height = len(y_labels)
-
+        # One "|" per column in the header, after the "y/x" label
+        height = lines[0].count("|")
         data_lines = lines[2:]
-        x_labels = [p.strip() for p in (line.split("|")[0] for line in data_lines)]
-        width = len(x_labels)
+        width = len(data_lines)
 
-        grid: list[list[list[Block]]] = [
-            [[] for _ in range(height)] for _ in range(width)
-        ]
+        # Levels repeat the same few cell texts, so each is parsed only once
+        cell_kinds: dict[str, tuple[str, ...]] = {}
 
+        grid: list[list[list[Block]]] = []
         for x_index, line in enumerate(data_lines):
-            parts = [p.strip() for p in line.split("|")]
-            cell_values = parts[1:]
-            for y_index, cell in enumerate(cell_values):
-                if cell:
-                    for name in cell.split(","):
-                        grid[x_index][y_index].append(Block(name.upper(), x_index, y_index))
+            fields = line.split("|")
+            fields += [""] * (height + 1 - len(fields))
+            row = []
+            # Field 0 is the row label
+            for y_index in range(height):
+                cell = fields[y_index + 1]
+                kinds_in_cell = cell_kinds.get(cell)
+                if kinds_in_cell is None:
+                    kinds_in_cell = cell_kinds[cell] = (
+                        tuple(name.strip().upper() for name in cell.split(","))
+                        if cell and not cell.isspace()
+                        else ()
+                    )
+                row.append([Block(kind, x_index, y_index) for kind in kinds_in_cell])
+            grid.append(row)
 
         return cls(grid)
 
+    # Binary snapshot layout, all integers little-endian:
+    #   header     magic "BABA", version u8, width u16, height u16, outcome u8
+    #   kind table count u16, then per kind: length u8 + ASCII name
+    #   cells      row-major records of: empty cells skipped u16, block count u8,
+    #              kind table index u16 per block; cells after the last record are empty
+    _SNAPSHOT_MAGIC = b"BABA"
+    _SNAPSHOT_VERSION = 1
+    _SNAPSHOT_HEADER = struct.Struct("<4sBHHB")
+
+    def to_bytes(self) -> bytes:
+        """Serialize the grid and outcome to the compact binary snapshot format."""
+        width, height = len(self.grid), len(self.grid[0])
+        kind_index: dict[str, int] = {}
+        records = bytearray()
+        skipped = 0
+        for row in self.grid:
+            for cell in row:
+                if not cell:
+                    skipped += 1
+                    continue
+                while skipped > 0xFFFF:
+                    records += struct.pack("<HB", 0xFFFF, 0)
+                    skipped -= 0xFFFF
+                records += struct.pack("<HB", skipped, len(cell))
+                for block in cell:
+                    index = kind_index.setdefault(block.kind, len(kind_index))
+                    records += struct.pack("<H", index)
+                skipped = 0
+
+        out = bytearray(
+            self._SNAPSHOT_HEADER.pack(
+                self._SNAPSHOT_MAGIC, self._SNAPSHOT_VERSION, width, height, self.outcome.value
+            )
+        )
+        out += struct.pack("<H", len(kind_index))
+        for kind in kind_index:
+            name = kind.encode("ascii")
+            out += struct.pack("<B", len(name)) + name
+        out += records
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "State":
+        """Load a State from `to_bytes` output; rules are re-derived from the grid."""
+        magic, version, width, height, outcome = cls._SNAPSHOT_HEADER.unpack_from(data)
+        if magic != cls._SNAPSHOT_MAGIC or version != cls._SNAPSHOT_VERSION:
+            raise ValueError(f"Not a version {cls._SNAPSHOT_VERSION} State snapshot")
+        offset = cls._SNAPSHOT_HEADER.size
+
+        (kind_count,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        kind_names = []
+        for _ in range(kind_count):
+            length = data[offset]
+            kind_names.append(data[offset + 1:offset + 1 + length].decode("ascii"))
+            offset += 1 + length
+
+        grid: list[list[list[Block]]] = [
+            [[] for _ in range(height)] for _ in range(width)
+        ]
+        position = 0
+        end = len(data)
+        while offset < end:
+            skipped, count = struct.unpack_from("<HB", data, offset)
+            offset += 3
+            position += skipped
+            if not count:
+                # Pure skip record, for runs of empty cells longer than a u16
+                continue
+            x, y = divmod(position, height)
+            cell = grid[x][y]
+            for index in struct.unpack_from(f"<{count}H", data, offset):
+                cell.append(Block(kind_names[index], x, y))
+            offset += 2 * count
+            position += 1
+
+        state = cls(grid)
+        state.outcome = Outcome(outcome)
+        return state
+
+    @classmethod
+    def _restore(
+        cls,
+        grid: list[list[list[Block]]],
+        kind_to_blocks: dict[str, list[Block]],
+        state_hash: int,
+        rules: tuple[dict[str, list[str]], dict[str, list[str]], dict[int, int]],
+        dirty_text_cells,
+        outcome: Outcome,
+    ) -> "State":
+        """
+        Build a state from a grid whose kind index, hash and rules are already
+        known, e.g. those of a PackedState, instead of recomputing them all.
+        The rule dicts are shared, not copied.
+        """
+        state = cls.__new__(cls)
+        state.grid = grid
+        state.kind_to_blocks = kind_to_blocks
+        state._hash = state_hash
+        state._canonical_key = None
+        state._bounds = state._compute_bounds()
+        # Lines of the current grid: refreshing re-scans the dirty ones as usual
+        state._rule_lines = state._compute_rule_lines()
+        state._dirty_text_cells = set(dirty_text_cells)
+        state.kind_to_properties, state.property_to_kinds, state.kind_property_masks = rules
+        state._cell_masks = {}
+        state._owns_cell_masks = True
+        state.outcome = outcome
+        state._cow = False
+        state._owned_rows = set()
+        state._owned_cells = set()
+        state._owned_kind_lists = set()
+        state._journal = None
+        state._checkpoints = []
+        if state.debug_indexes:
+            state.check_indexes()
+        return state
+
+    def clone(self) -> "State":
+        """
+        Return an independent copy of this state that shares structure with it.
+
+        Rows, cells, blocks and kind lists are shared copy-on-write: either
+        state copies a row, cell or kind list the first time it mutates it or
+        hands its blocks out through a query. Blocks obtained before cloning
+        should be looked up again, since they may now belong to the other copy.
+        """
+        new = State.__new__(State)
+        new.grid = list(self.grid)
+        new.kind_to_blocks = dict(self.kind_to_blocks)
+        new._hash = self._hash
+        new._canonical_key = self._canonical_key
+        new._bounds = self._bounds
+        # Rule lines and rule dicts are replaced on refresh, never edited in place
+        new._rule_lines = self._rule_lines
+        new._dirty_text_cells = set(self._dirty_text_cells)
+        new.kind_to_properties = self.kind_to_properties
+        new.property_to_kinds = self.property_to_kinds
+        new.kind_property_masks = self.kind_property_masks
+        new._cell_masks = self._cell_masks
+        new.outcome = self.outcome
+        # The copy starts without checkpoints, the journal stays with this state
+        new._journal = None
+        new._checkpoints = []
+
+        self._share()
+        new._share()
+        return new
+
     def __eq__(self, other):
-        self.sort_cells_lexicographically()
-        if isinstance(other, State):
-            other.sort_cells_lexicographically()
-        return isinstance(other, State) and self.grid == other.grid
+        if not isinstance(other, State):
+            return False
+        if self is other:
+            return True
+        return (
+            self._hash == other._hash
+            and len(self.grid) == len(other.grid)
+            and len(self.grid[0]) == len(other.grid[0])
+            and self.canonical_key() == other.canonical_key()
+        )
 
     def __hash__(self):
-        self.sort_cells_lexicographically()
-        return hash(
-            tuple(
-                tuple(tuple(block for block in cell) for cell in row)
-                for row in self.grid
+        return self._hash
+
+    @property
+    def zobrist_hash(self) -> int:
+        """
+        64-bit hash of the block layout, updated incrementally on every mutation.
+
+        Block keys are summed rather than XOR-ed so that identical blocks
+        stacked in one cell do not cancel out.
+        """
+        return self._hash
+
+    def canonical_key(self) -> tuple:
+        """Order-independent key of the block layout, used for equality."""
+        if self._canonical_key is None:
+            self._canonical_key = tuple(
+                sorted((b.kind, b.x, b.y) for blocks in self.kind_to_blocks.values() for b in blocks)
             )
-        )
+        return self._canonical_key
 
     def __repr__(self):
-        lines = []
-        for x in range(len(self.grid)):
+        # Only the active region is shown, its origin gives the original coordinates
+        x_min, y_min, x_stop, y_stop = self.active_region
+        lines = [f"origin ({x_min}, {y_min})"]
+        for x in range(x_min, x_stop):
             col_str = []
-            for y in range(len(self.grid[0])):
+            for y in range(y_min, y_stop):
                 cell = self.grid[x][y]
                 col_str.append(",".join(b.kind for b in cell) or ".")
             lines.append(" ".join(col_str))
@@ -77,8 +296,10 @@ class State:
         width, height = len(self.grid[0]), len(self.grid)
         grid = [["" for _ in range(width)] for _ in range(height)]
 
-        for x in range(height):
-            for y in range(width):
+        # Cells outside the active region are empty, the table keeps the full size
+        x_min, y_min, x_stop, y_stop = self.active_region
+        for x in range(x_min, x_stop):
+            for y in range(y_min, y_stop):
                 existing = self.grid[x][y]
                 grid[x][y] = ", ".join(block.kind for block in existing)
 
@@ -106,8 +327,19 @@ class State:
 
     def add_block(self, block):
         """Add a block to the grid."""
+        if self._cow:
+            self._own_cell(block.x, block.y)
         self.grid[block.x][block.y].append(block)
-        self.kind_to_blocks = self._compute_kind_to_blocks()
+        self._own_kind_list(block.kind).append(block)
+        self._extend_bounds(block.x, block.y)
+        self._mark_text_dirty(block, block.x, block.y)
+        self._forget_cell_masks((block.x, block.y))
+        self._hash = (self._hash + _zobrist_key(block.kind_id, block.x, block.y)) & _HASH_MASK
+        self._canonical_key = None
+        if self._journal is not None:
+            self._journal.append((_UNDO_ADD, block.x, block.y))
+        if self.debug_indexes:
+            self.check_indexes()
 
     def move_block(self, block: Block, nx: int, ny: int):
         """Move a block to new coordinates."""
@@ -116,15 +348,46 @@ class State:
             print(block)
             return
 
-        self.grid[block.x][block.y].remove(block)
+        if self._cow:
+            self._own_cell(block.x, block.y)
+            self._own_cell(nx, ny)
+
+        # The stored block is moved, even if the caller passed an equal copy
+        # of it; being indexed by identity, its kind list stays valid.
+        cell_index, block = self._pop_from_cell(block)
+        if self._journal is not None:
+            self._journal.append((_UNDO_MOVE, nx, ny, block.x, block.y, cell_index))
+        self._mark_text_dirty(block, block.x, block.y)
+        self._mark_text_dirty(block, nx, ny)
+        self._forget_cell_masks((block.x, block.y), (nx, ny))
+        self._hash = (
+            self._hash
+            - _zobrist_key(block.kind_id, block.x, block.y)
+            + _zobrist_key(block.kind_id, nx, ny)
+        ) & _HASH_MASK
+        self._canonical_key = None
+        self._shrink_bounds(block.x, block.y)
+        self._extend_bounds(nx, ny)
         block.x, block.y = nx, ny
         self.grid[nx][ny].append(block)
-        self.kind_to_blocks = self._compute_kind_to_blocks()
+        if self.debug_indexes:
+            self.check_indexes()
 
     def remove_block(self, block):
         """Remove a block completely from the grid."""
-        self.grid[block.x][block.y].remove(block)
-        self.kind_to_blocks = self._compute_kind_to_blocks()
+        if self._cow:
+            self._own_cell(block.x, block.y)
+        cell_index, removed = self._pop_from_cell(block)
+        kind_index = self._unindex_block(removed)
+        if self._journal is not None:
+            self._journal.append((_UNDO_REMOVE, removed.kind, removed.x, removed.y, cell_index, kind_index))
+        self._mark_text_dirty(removed, removed.x, removed.y)
+        self._forget_cell_masks((removed.x, removed.y))
+        self._shrink_bounds(removed.x, removed.y)
+        self._hash = (self._hash - _zobrist_key(removed.kind_id, removed.x, removed.y)) & _HASH_MASK
+        self._canonical_key = None
+        if self.debug_indexes:
+            self.check_indexes()
 
     # -------------------------------
     # Queries
@@ -132,28 +395,191 @@ class State:
 
     def get_blocks_in_cell(self, x, y) -> list[Block]:
         """Return all blocks in a specific grid cell."""
+        if self._cow:
+            return self.grid[self._own_cell(x, y)][y]
         return self.grid[x][y]
 
     def get_blocks_by_name(self, block_name: str) -> list[Block]:
         """Return all blocks of the specified kind."""
-        return self.kind_to_blocks.get(block_name, [])
+        if self._cow:
+            self._own_kind_blocks(block_name)
+        # Copied so callers can mutate the state while iterating the result.
+        return list(self.kind_to_blocks.get(block_name, ()))
 
     def get_blocks_by_property(self, property_name: str) -> list[Block]:
-        """Return all blocks (instances) that have the given property."""
-        kinds = self.property_to_kinds.get(property_name, [])
+        """Return all blocks (instances) that have the given property; the name is case-insensitive."""
+        kinds = self.property_to_kinds.get(property_name.upper(), [])
+        if self._cow:
+            for kind in kinds:
+                self._own_kind_blocks(kind)
         return [block for kind in kinds for block in self.kind_to_blocks.get(kind, [])]
 
     def get_properties_of_block(self, block: Block) -> list[str]:
         return self.kind_to_properties.get(block.kind, [])
 
+    def has_property(self, block: Block, property_name: str) -> bool:
+        """Return whether the block's kind currently has the given property; the name is case-insensitive."""
+        return bool(self.kind_property_masks.get(block.kind_id, 0) & property_mask(property_name.upper()))
+
+    def get_property_mask(self, block: Block) -> int:
+        """Return the bitmask of all properties of the block's kind, see `property_mask`."""
+        return self.kind_property_masks.get(block.kind_id, 0)
+
+    def cell_property_mask(self, x: int, y: int) -> int:
+        """
+        Return the union of the property masks of every block in cell (x, y).
+
+        Cells outside the grid hold nothing and have an empty mask.
+        """
+        mask = self._cell_masks.get((x, y))
+        if mask is None:
+            if not self.in_bounds(x, y):
+                return 0
+            mask = 0
+            for block in self.grid[x][y]:
+                mask |= self.kind_property_masks.get(block.kind_id, 0)
+            self._own_cell_masks()[(x, y)] = mask
+        return mask
+
+    def cell_has_property(self, x: int, y: int, property_name: str) -> bool:
+        """Return whether any block in cell (x, y) has the given property; the name is case-insensitive."""
+        return bool(self.cell_property_mask(x, y) & property_mask(property_name.upper()))
+
+    def blocks_at_with_property(self, x: int, y: int, property_name: str) -> list[Block]:
+        """Return the blocks in cell (x, y) that have the given property; the name is case-insensitive."""
+        bit = property_mask(property_name.upper())
+        if not self.cell_property_mask(x, y) & bit:
+            return []
+        masks = self.kind_property_masks
+        return [b for b in self.get_blocks_in_cell(x, y) if masks.get(b.kind_id, 0) & bit]
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        """Return whether (x, y) lies inside the grid."""
+        return 0 <= x < len(self.grid) and 0 <= y < len(self.grid[0])
+
+    @property
+    def active_region(self) -> tuple[int, int, int, int]:
+        """
+        Box around every block, as (x_min, y_min, x_stop, y_stop) in grid coordinates.
+
+        The box is padded by ACTIVE_REGION_PADDING cells and clamped to the
+        grid, so cells outside it are empty and stay empty after one action.
+        Iterate it with `range(x_min, x_stop)` and `range(y_min, y_stop)`.
+        """
+        if self._bounds is None:
+            self._bounds = self._compute_bounds()
+            if self._bounds is None:
+                return 0, 0, 0, 0
+        x_min, y_min, x_max, y_max = self._bounds
+        pad = self.ACTIVE_REGION_PADDING
+        return (
+            max(x_min - pad, 0),
+            max(y_min - pad, 0),
+            min(x_max + pad + 1, len(self.grid)),
+            min(y_max + pad + 1, len(self.grid[0])),
+        )
+
+    def active_cells(self):
+        """Yield the (x, y) coordinates of every cell in the active region."""
+        x_min, y_min, x_stop, y_stop = self.active_region
+        for x in range(x_min, x_stop):
+            for y in range(y_min, y_stop):
+                yield x, y
+
+    # -------------------------------
+    # Make / unmake
+    # -------------------------------
+
+    def checkpoint(self) -> int:
+        """
+        Start recording an undo journal of every block added, moved or removed.
+
+        `rollback` then reverts the state in place to this checkpoint, in time
+        proportional to the number of changes rather than to the grid size,
+        which lets a depth-first search apply and unapply actions on a single
+        state instead of cloning it. Checkpoints nest; each one must be closed
+        by `rollback` or `commit`, innermost first. The outcome and rules are
+        restored too, while grid edits that bypass the mutators are not
+        journaled.
+
+        Returns the nesting depth of the new checkpoint.
+        """
+        if self._journal is None:
+            self._journal = []
+        self._checkpoints.append((
+            len(self._journal),
+            self.outcome,
+            set(self._dirty_text_cells),
+            self._rule_lines,
+            self.kind_to_properties,
+            self.property_to_kinds,
+            self.kind_property_masks,
+        ))
+        return len(self._checkpoints)
+
+    def rollback(self):
+        """Revert every change made since the innermost open checkpoint and close it."""
+        if not self._checkpoints:
+            raise RuntimeError("rollback() without an open checkpoint")
+        (
+            journal_length,
+            outcome,
+            dirty_text_cells,
+            rule_lines,
+            kind_to_properties,
+            property_to_kinds,
+            kind_property_masks,
+        ) = self._checkpoints.pop()
+
+        journal = self._journal
+        # Undo operations go through the mutators, which must not journal them
+        self._journal = None
+        while len(journal) > journal_length:
+            self._undo(journal.pop())
+        self._journal = journal if self._checkpoints else None
+
+        self.outcome = outcome
+        self._dirty_text_cells = dirty_text_cells
+        self._rule_lines = rule_lines
+        self.kind_to_properties = kind_to_properties
+        self.property_to_kinds = property_to_kinds
+        self._set_kind_property_masks(kind_property_masks)
+        if self.debug_indexes:
+            self.check_indexes()
+
+    def commit(self):
+        """Keep the changes made since the innermost open checkpoint and close it."""
+        if not self._checkpoints:
+            raise RuntimeError("commit() without an open checkpoint")
+        self._checkpoints.pop()
+        # An enclosing checkpoint can still roll these changes back
+        if not self._checkpoints:
+            self._journal = None
+
     # -------------------------------
     # Rule management
     # -------------------------------
 
+    @property
+    def dirty_text_cells(self) -> frozenset[tuple[int, int]]:
+        """Cells where text blocks were added, moved or removed since the last `refresh_rules`."""
+        return frozenset(self._dirty_text_cells)
+
     def refresh_rules(self):
-        """Recompute all rules and relationships."""
+        """
+        Recompute all rules and relationships.
+
+        Only rule lines through text blocks that were added, moved or removed
+        since the last refresh are re-scanned; if no text changed this is a no-op.
+        """
+        if not self._dirty_text_cells:
+            return
+        self._update_dirty_rule_lines()
         self.kind_to_properties = self._compute_kind_to_properties()
         self.property_to_kinds = self._compute_property_to_kinds()
+        self._set_kind_property_masks(self._compute_kind_property_masks())
+        if self.debug_indexes:
+            self.check_rules()
 
     def print_rules(self) -> str:
         rules = {
@@ -163,14 +589,48 @@ class State:
         }
         return "\n".join(sorted(rules))
 
+    # -------------------------------
+    # Debugging
+    # -------------------------------
+
+    def check_indexes(self):
+        """Assert that the incremental indexes match a full recomputation."""
+        expected = self._compute_kind_to_blocks()
+        actual = self.kind_to_blocks
+        assert actual.keys() == expected.keys(), (
+            f"kind_to_blocks kinds diverged: {sorted(actual)} != {sorted(expected)}"
+        )
+        for kind, blocks in expected.items():
+            assert sorted(map(id, actual[kind])) == sorted(map(id, blocks)), (
+                f"kind_to_blocks[{kind!r}] diverged: {actual[kind]} != {blocks}"
+            )
+        assert self._hash == self._compute_hash(), "zobrist hash diverged"
+        if self._bounds is not None:
+            assert self._bounds == self._compute_bounds(), (
+                f"active region bounds diverged: {self._bounds} != {self._compute_bounds()}"
+            )
+        for (x, y), mask in self._cell_masks.items():
+            expected_mask = 0
+            for block in self.grid[x][y]:
+                expected_mask |= self.kind_property_masks.get(block.kind_id, 0)
+            assert mask == expected_mask, f"cached property mask of cell ({x}, {y}) diverged"
+
+    def check_rules(self):
+        """Assert that the incrementally parsed rules match a full re-parse."""
+        expected = self._compute_kind_to_properties(self._compute_rule_lines())
+        actual = self.kind_to_properties
+        assert {k: set(v) for k, v in actual.items()} == {k: set(v) for k, v in expected.items()}, (
+            f"kind_to_properties diverged: {actual} != {expected}"
+        )
+        assert self.kind_property_masks == self._compute_kind_property_masks(), "property masks diverged"
+
     # -------------------------------
     # Internal helpers
     # -------------------------------
 
     def sort_cells_lexicographically(self):
-        for x in range(len(self.grid)):
-            for y in range(len(self.grid[0])):
-                self.grid[x][y].sort(key=lambda b: b.kind)
+        for x, y in self.active_cells():
+            self.grid[x][y].sort(key=lambda b: b.kind)
 
     def _compute_kind_to_blocks(self) -> dict[str, list[Block]]:
         kind_to_blocks: dict[str, list[Block]] = {}
@@ -180,44 +640,234 @@ class State:
                     kind_to_blocks.setdefault(block.kind, []).append(block)
         return kind_to_blocks
 
-    def _compute_kind_to_properties(self) -> dict[str, list[str]]:
+    def _compute_bounds(self) -> Optional[tuple[int, int, int, int]]:
+        xs = [b.x for blocks in self.kind_to_blocks.values() for b in blocks]
+        if not xs:
+            return None
+        ys = [b.y for blocks in self.kind_to_blocks.values() for b in blocks]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def _extend_bounds(self, x: int, y: int):
+        if self._bounds is not None:
+            x_min, y_min, x_max, y_max = self._bounds
+            self._bounds = min(x_min, x), min(y_min, y), max(x_max, x), max(y_max, y)
+
+    def _shrink_bounds(self, x: int, y: int):
+        """Forget the bounds if a block left (x, y) on their edge; they are recomputed lazily."""
+        if self._bounds is not None:
+            x_min, y_min, x_max, y_max = self._bounds
+            if x in (x_min, x_max) or y in (y_min, y_max):
+                self._bounds = None
+
+    def _share(self):
+        """Mark every row, cell, block and kind list as possibly shared."""
+        self._cow = True
+        self._owns_cell_masks = False
+        self._owned_rows = set()
+        self._owned_cells = set()
+        self._owned_kind_lists = set()
+
+    def _own_cell(self, x: int, y: int) -> int:
+        """
+        Give this state private copies of cell (x, y) and of its blocks.
+
+        Returns the normalized row index, so that negative coordinates keep
+        their list-indexing meaning.
+        """
+        if x < 0:
+            x += len(self.grid)
+        if y < 0:
+            y += len(self.grid[0])
+        if (x, y) in self._owned_cells:
+            return x
+
+        if x not in self._owned_rows:
+            self.grid[x] = list(self.grid[x])
+            self._owned_rows.add(x)
+        shared = self.grid[x][y]
+        private = [Block(b.kind, b.x, b.y) for b in shared]
+        self.grid[x][y] = private
+        self._owned_cells.add((x, y))
+
+        for old, new in zip(shared, private):
+            blocks = self._own_kind_list(old.kind)
+            for i, indexed in enumerate(blocks):
+                if indexed is old:
+                    blocks[i] = new
+                    break
+        return x
+
+    def _own_kind_blocks(self, kind: str):
+        """Own every cell holding a block of `kind`, in one pass over its list."""
+        blocks = self.kind_to_blocks.get(kind)
+        if not blocks:
+            return
+        cells = {(b.x, b.y) for b in blocks} - self._owned_cells
+        if not cells:
+            return
+
+        # Own the cells of this kind without per-block searches in its list,
+        # then fix the list up in a single pass.
+        replaced: dict[int, Block] = {}
+        for x, y in cells:
+            if x not in self._owned_rows:
+                self.grid[x] = list(self.grid[x])
+                self._owned_rows.add(x)
+            shared = self.grid[x][y]
+            private = []
+            for b in shared:
+                new = Block(b.kind, b.x, b.y)
+                private.append(new)
+                if b.kind == kind:
+                    replaced[id(b)] = new
+                else:
+                    other = self._own_kind_list(b.kind)
+                    other[next(i for i, o in enumerate(other) if o is b)] = new
+            self.grid[x][y] = private
+            self._owned_cells.add((x, y))
+
+        blocks = self._own_kind_list(kind)
+        for i, b in enumerate(blocks):
+            new = replaced.get(id(b))
+            if new is not None:
+                blocks[i] = new
+
+    def _own_kind_list(self, kind: str) -> list[Block]:
+        """Return this state's private list of blocks of `kind`, creating it if needed."""
+        blocks = self.kind_to_blocks.get(kind)
+        if blocks is None:
+            blocks = self.kind_to_blocks[kind] = []
+            self._owned_kind_lists.add(kind)
+        elif self._cow and kind not in self._owned_kind_lists:
+            blocks = self.kind_to_blocks[kind] = list(blocks)
+            self._owned_kind_lists.add(kind)
+        return blocks
+
+    def _compute_hash(self) -> int:
+        total = 0
+        for blocks in self.kind_to_blocks.values():
+            for b in blocks:
+                total += _zobrist_key(b.kind_id, b.x, b.y)
+        return total & _HASH_MASK
+
+    def _pop_from_cell(self, block: Block) -> tuple[int, Block]:
+        """Remove `block` from its cell, preferring the identical object; returns (index, block)."""
+        cell = self.grid[block.x][block.y]
+        for i, stored in enumerate(cell):
+            if stored is block:
+                return i, cell.pop(i)
+        i = cell.index(block)
+        return i, cell.pop(i)
+
+    def _unindex_block(self, block: Block) -> int:
+        """Remove `block` from its kind list and return the position it had there."""
+        blocks = self._own_kind_list(block.kind)
+        index = len(blocks)
+        for i, indexed in enumerate(blocks):
+            if indexed is block:
+                del blocks[i]
+                index = i
+                break
+        if not blocks:
+            del self.kind_to_blocks[block.kind]
+        return index
+
+    def _undo(self, entry: tuple):
+        """
+        Revert one journal entry through the regular mutators, restoring list positions.
+
+        Entries hold positions rather than Block objects, which a clone taken
+        while journaling replaces with copies. Undoing in reverse order leaves
+        every cell as it was right after the change, so an added or moved
+        block is the last one of its cell.
+        """
+        tag = entry[0]
+        if tag == _UNDO_ADD:
+            _, x, y = entry
+            self.remove_block(self.get_blocks_in_cell(x, y)[-1])
+        elif tag == _UNDO_MOVE:
+            _, nx, ny, x, y, cell_index = entry
+            self.move_block(self.get_blocks_in_cell(nx, ny)[-1], x, y)
+            cell = self.grid[x][y]
+            cell.insert(cell_index, cell.pop())
+        else:
+            _, kind, x, y, cell_index, kind_index = entry
+            block = Block(kind, x, y)
+            self.add_block(block)
+            cell = self.grid[block.x][block.y]
+            cell.insert(cell_index, cell.pop())
+            blocks = self.kind_to_blocks[block.kind]
+            blocks.insert(kind_index, blocks.pop())
+
+    def _compute_rule_lines(self) -> dict[tuple[str, int, int], list[tuple[int, int]]]:
+        """Find the rules of the whole grid, looking only at lines centered on an IS."""
+        rule_lines: dict[tuple[str, int, int], list[tuple[int, int]]] = {}
+        for block in self.kind_to_blocks.get(kinds.name_of(TEXT_IS), ()):
+            for key in (("H", block.x, block.y - 1), ("V", block.x - 1, block.y)):
+                rules = self._scan_rule_line(*key)
+                if rules:
+                    rule_lines[key] = rules
+        return rule_lines
+
+    def _scan_rule_line(self, axis: str, x: int, y: int) -> list[tuple[int, int]]:
+        """
+        Return the rules spelled by the triple starting at (x, y) along `axis`,
+        as (noun id, property id) pairs of the kinds the texts refer to.
+        """
+        dx, dy = (0, 1) if axis == "H" else (1, 0)
+        if x < 0 or y < 0 or x + 2 * dx >= len(self.grid) or y + 2 * dy >= len(self.grid[0]):
+            return []
+
+        if not any(b.kind_id == TEXT_IS for b in self.grid[x + dx][y + dy]):
+            return []
+
+        rules = []
+        for noun in self.grid[x][y]:
+            if not kinds.flags_of(noun.kind_id) & TEXT_NOUN:
+                continue
+            for prop in self.grid[x + 2 * dx][y + 2 * dy]:
+                if kinds.flags_of(prop.kind_id) & (TEXT_NOUN | PROPERTY):
+                    rules.append((kinds.references_to(noun.kind_id), kinds.references_to(prop.kind_id)))
+        return rules
+
+    def _update_dirty_rule_lines(self):
+        """Re-scan only the rule lines passing through text cells that changed."""
+        keys = set()
+        rule_lines = dict(self._rule_lines)
+        for x, y in self._dirty_text_cells:
+            for offset in range(3):
+                keys.add(("H", x, y - offset))
+                keys.add(("V", x - offset, y))
+        self._dirty_text_cells = set()
+
+        for key in keys:
+            rules = self._scan_rule_line(*key)
+            if rules:
+                rule_lines[key] = rules
+            else:
+                rule_lines.pop(key, None)
+        self._rule_lines = rule_lines
+
+    def _mark_text_dirty(self, block: Block, x: int, y: int):
+        if kinds.flags_of(block.kind_id) & TEXT:
+            self._dirty_text_cells.add((x, y))
+
+    def _compute_kind_to_properties(
+        self, rule_lines: Optional[dict[tuple[str, int, int], list[tuple[int, int]]]] = None
+    ) -> dict[str, list[str]]:
+        if rule_lines is None:
+            rule_lines = self._rule_lines
         kind_to_properties: dict[str, list[str]] = {}
-        rows = len(self.grid)
-        cols = len(self.grid[0]) if rows > 0 else 0
-
-        # Horizontal rules
-        for x in range(rows):
-            for y in range(cols - 2):
-                kinds1 = self._get_kinds(x, y)
-                kinds2 = self._get_kinds(x, y + 1)
-                kinds3 = self._get_kinds(x, y + 2)
-
-                if "TEXT_IS" in kinds2:
-                    for noun in kinds1:
-                        for prop in kinds3:
-                            if noun.lower() in noun_types and prop.lower() in (noun_types + property_types):
-                                self._add_rule(kind_to_properties, noun_references_to(noun), prop.removeprefix("TEXT_"))
-
-        # Vertical rules
-        for x in range(rows - 2):
-            for y in range(cols):
-                kinds1 = self._get_kinds(x, y)
-                kinds2 = self._get_kinds(x + 1, y)
-                kinds3 = self._get_kinds(x + 2, y)
-
-                if "TEXT_IS" in kinds2:
-                    for noun in kinds1:
-                        for prop in kinds3:
-                            if noun.lower() in noun_types and prop.lower() in (noun_types + property_types):
-                                self._add_rule(kind_to_properties, noun_references_to(noun), prop.removeprefix("TEXT_"))
+
+        # Horizontal rules first, then vertical, each in grid order
+        for key in sorted(rule_lines):
+            for noun, prop in rule_lines[key]:
+                self._add_rule(kind_to_properties, kinds.name_of(noun), kinds.name_of(prop))
 
         # "text_*" blocks are pushable
-        for x in range(rows):
-            for y in range(cols):
-                kinds = self._get_kinds(x, y)
-                for kind in kinds:
-                    if kind.startswith("TEXT_"):
-                        self._add_rule(kind_to_properties, kind, "PUSH")
+        for kind in self.kind_to_blocks:
+            if kinds.flags_of(kinds.id_of(kind)) & TEXT:
+                self._add_rule(kind_to_properties, kind, "PUSH")
 
         return kind_to_properties
 
@@ -228,10 +878,32 @@ class State:
                 property_to_kinds.setdefault(prop, []).append(kind)
         return property_to_kinds
 
+    def _own_cell_masks(self) -> dict[tuple[int, int], int]:
+        if not self._owns_cell_masks:
+            self._cell_masks = dict(self._cell_masks)
+            self._owns_cell_masks = True
+        return self._cell_masks
+
+    def _forget_cell_masks(self, *cells: tuple[int, int]):
+        if any(cell in self._cell_masks for cell in cells):
+            cell_masks = self._own_cell_masks()
+            for cell in cells:
+                cell_masks.pop(cell, None)
+
+    def _set_kind_property_masks(self, kind_property_masks: dict[int, int]):
+        if kind_property_masks != self.kind_property_masks:
+            self.kind_property_masks = kind_property_masks
+            self._cell_masks = {}
+            self._owns_cell_masks = True
+
+    def _compute_kind_property_masks(self) -> dict[int, int]:
+        return {
+            kinds.id_of(kind): property_mask(*props)
+            for kind, props in self.kind_to_properties.items()
+        }
+
     def _add_rule(self, kind_to_properties: dict[str, list[str]], noun: str, prop: str):
         kind_to_properties.setdefault(noun, [])
         if prop not in kind_to_properties[noun]:
             kind_to_properties[noun].append(prop)
 
-    def _get_kinds(self, x: int, y: int) -> list[str]:
-        return [b.kind for b in self.grid[x][y]]
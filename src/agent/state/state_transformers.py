@@ -66,7 +66,7 @@ HARD_TRANSFORM = add_text_versions(HARD_TRANSFORM)
 # ----------------------------
 # Transformation function
 # ----------------------------
-import copy
+from src.agent.state.block import Block
 
 
 def symbolic_transform(state, mode="soft"):
@@ -75,13 +75,14 @@ def symbolic_transform(state, mode="soft"):
     mode: "soft" (preserve partial meaning) or "hard" (fully randomized)
     """
     mapping = SOFT_TRANSFORM if mode == "soft" else HARD_TRANSFORM
-    new_state = copy.deepcopy(state)
+    new_state = state.clone()
 
-    # Apply mapping to all blocks
-    for x in range(len(new_state.grid)):
-        for y in range(len(new_state.grid[0])):
-            for block in new_state.grid[x][y]:
-                block.kind = mapping.get(block.kind, block.kind)
+    # Replace every mapped block by a renamed copy
+    for kind in list(new_state.kind_to_blocks):
+        if kind in mapping:
+            for block in new_state.get_blocks_by_name(kind):
+                new_state.remove_block(block)
+                new_state.add_block(Block(mapping[kind], block.x, block.y))
 
     # Refresh rules
     new_state.refresh_rules()
@@ -0,0 +1,98 @@
+"""
+Helpers available to step functions by name, next to State, Block, Action and Outcome.
+
+They answer the questions every step function asks, such as what a move
+pushes, from the indexes of State, in time proportional to the cells
+involved rather than to the number of blocks. Property names are
+case-insensitive.
+"""
+from typing import Iterable, Optional
+
+from src.agent.state.actions import Action
+from src.agent.state.block import Block
+from src.agent.state.block_type import property_mask
+from src.agent.state.state import State
+
+DIRECTIONS: dict[Action, tuple[int, int]] = {
+    Action.STILL: (0, 0),
+    Action.UP: (-1, 0),
+    Action.DOWN: (1, 0),
+    Action.LEFT: (0, -1),
+    Action.RIGHT: (0, 1),
+}
+
+_STOP = property_mask("STOP")
+_PUSH = property_mask("PUSH")
+
+
+def direction_of(action: Action) -> tuple[int, int]:
+    """Return the (dx, dy) offset of `action`; (0, 0) for Action.STILL."""
+    return DIRECTIONS[action]
+
+
+def in_bounds(state: State, x: int, y: int) -> bool:
+    """Return whether (x, y) lies inside the grid."""
+    return state.in_bounds(x, y)
+
+
+def blocks_in_cell_with_property(state: State, x: int, y: int, property_name: str) -> list[Block]:
+    """Return the blocks in cell (x, y) that have the given property; empty outside the grid."""
+    return state.blocks_at_with_property(x, y, property_name)
+
+
+def push_chain(state: State, block: Block, dx: int, dy: int) -> Optional[list[Block]]:
+    """
+    Return the PUSH blocks that move ahead of `block` when it moves by (dx, dy),
+    nearest first, or None if the move is blocked.
+
+    A move is blocked by the edge of the grid and by STOP blocks that are not
+    also PUSH, anywhere along the line of pushed blocks.
+    """
+    masks = state.kind_property_masks
+    pushed: list[Block] = []
+    x, y = block.x + dx, block.y + dy
+    while True:
+        if not state.in_bounds(x, y):
+            return None
+        mask = state.cell_property_mask(x, y)
+        if not mask & (_STOP | _PUSH):
+            return pushed
+        cell = state.get_blocks_in_cell(x, y)
+        if mask & _STOP and any(masks.get(b.kind_id, 0) & (_STOP | _PUSH) == _STOP for b in cell):
+            return None
+        pushed.extend(b for b in cell if masks.get(b.kind_id, 0) & _PUSH)
+        x, y = x + dx, y + dy
+
+
+def move_blocks(state: State, blocks: Iterable[Block], dx: int, dy: int) -> None:
+    """Move every block by (dx, dy), each once even if listed several times."""
+    moved: set[int] = set()
+    for block in blocks:
+        if id(block) not in moved:
+            moved.add(id(block))
+            state.move_block(block, block.x + dx, block.y + dy)
+
+
+def try_move(state: State, block: Block, dx: int, dy: int) -> bool:
+    """
+    Move `block` by (dx, dy) together with everything it pushes, see `push_chain`.
+
+    Returns False, leaving the state unchanged, if the move is blocked.
+    """
+    pushed = push_chain(state, block, dx, dy)
+    if pushed is None:
+        return False
+    # Farthest first, so that cells are vacated before being entered
+    move_blocks(state, [*reversed(pushed), block], dx, dy)
+    return True
+
+
+# Names put into the environment step functions are executed in
+HELPERS = {
+    "direction_of": direction_of,
+    "in_bounds": in_bounds,
+    "blocks_in_cell_with_property": blocks_in_cell_with_property,
+    "push_chain": push_chain,
+    "move_blocks": move_blocks,
+    "try_move": try_move,
+}
@@ -20,16 +20,20 @@ def format_tile_diffs(
     """
     lines: List[str] = []
 
-    for x in range(len(previous.grid)):
-        for y in range(len(previous.grid[0])):
-            if simulated.get_blocks_in_cell(x, y) != real.get_blocks_in_cell(x, y):
-                previous_kinds = list(
-                    map(lambda block: block.kind, previous.get_blocks_in_cell(x, y))
-                )
-                simulated_kinds = list(
-                    map(lambda block: block.kind, simulated.get_blocks_in_cell(x, y))
-                )
-                real_kinds = list(map(lambda block: block.kind, real.get_blocks_in_cell(x, y)))
+    # Cells outside all three active regions are empty in every state
+    regions = [state.active_region for state in (previous, simulated, real)]
+    x_min = min(region[0] for region in regions)
+    y_min = min(region[1] for region in regions)
+    x_stop = max(region[2] for region in regions)
+    y_stop = max(region[3] for region in regions)
+
+    for x in range(x_min, x_stop):
+        for y in range(y_min, y_stop):
+            simulated_kinds = [block.kind for block in simulated.grid[x][y]]
+            real_kinds = [block.kind for block in real.grid[x][y]]
+            # The order blocks are stacked in does not matter, as in State.__eq__
+            if sorted(simulated_kinds) != sorted(real_kinds):
+                previous_kinds = [block.kind for block in previous.grid[x][y]]
 
                 lines.append(f"Differences at X={x},Y={y}:")
                 lines.append(f"  - pre-action              : {previous_kinds}")
@@ -0,0 +1,37 @@
+import pathlib
+from typing import Callable
+
+import pytest
+
+from src.agent.modules.memory.step_function_cache import step_function_cache
+from src.agent.state import State, Action
+
+DATA_DIR = pathlib.Path(__file__).parent / "planner" / "data"
+STATE_DIR = DATA_DIR / "state_files"
+STEP_DIR = DATA_DIR / "step_functions"
+
+
+@pytest.fixture
+def state_file():
+    def _path(level_id: int) -> pathlib.Path:
+        id: str = f'{level_id if level_id >= 10 else f"0{level_id}"}'
+        return STATE_DIR / f'level_{id}.txt'
+    return _path
+
+
+@pytest.fixture
+def load_state(state_file):
+    def _load(level_id: int) -> State:
+        txt = state_file(level_id).read_text()
+        return State.from_grid_string(txt)
+    return _load
+
+
+@pytest.fixture
+def load_step_function():
+    def _load(filename: str) -> Callable[[State, Action], State]:
+        txt = (STEP_DIR / filename).read_text()
+        step_func: Callable[[State, Action], State] = step_function_cache.get(txt)
+
+        return step_func
+    return _load
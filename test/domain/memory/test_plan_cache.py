@@ -0,0 +1,69 @@
+from src.agent.modules.memory.plan_cache import PlanCache
+from src.agent.state import State, Block, Action
+
+STEP_FUNCTION = "def step(state, action):\n    return state\n"
+
+
+def goal_validator(trajectory, current_state):
+    return False
+
+
+def other_goal_validator(trajectory, current_state):
+    return True
+
+
+def test_plans_survive_a_restart(tmp_path, load_state):
+    path = str(tmp_path / "plan_cache.json")
+    state = load_state(0)
+    plan = [Action.RIGHT, Action.UP, Action.STILL]
+
+    PlanCache(path).put(state, STEP_FUNCTION, goal_validator, plan)
+    reloaded = PlanCache(path)
+    reloaded.load()
+
+    assert reloaded.get(load_state(0), STEP_FUNCTION, goal_validator) == plan
+    assert reloaded.hits == 1
+
+
+def test_lookups_do_not_write_the_file(tmp_path, load_state):
+    path = tmp_path / "plan_cache.json"
+    cache = PlanCache(str(path))
+    cache.put(load_state(0), STEP_FUNCTION, goal_validator, [Action.RIGHT])
+    path.unlink()
+
+    assert cache.get(load_state(0), STEP_FUNCTION, goal_validator) == [Action.RIGHT]
+    assert cache.get(load_state(1), STEP_FUNCTION, goal_validator) is None
+    assert not path.exists()
+
+
+def test_key_depends_on_state_step_function_and_goal(tmp_path, load_state):
+    cache = PlanCache(str(tmp_path / "plan_cache.json"))
+    state = load_state(0)
+    cache.put(state, STEP_FUNCTION, goal_validator, [Action.RIGHT])
+
+    moved = state.clone()
+    baba = moved.get_blocks_by_name("BABA")[0]
+    moved.move_block(baba, baba.x, baba.y + 1)
+
+    assert cache.get(moved, STEP_FUNCTION, goal_validator) is None
+    assert cache.get(state, STEP_FUNCTION + "\n# changed", goal_validator) is None
+    assert cache.get(state, STEP_FUNCTION, other_goal_validator) is None
+    assert cache.misses == 3
+
+
+def test_least_recently_used_plans_are_evicted(tmp_path):
+    cache = PlanCache(str(tmp_path / "plan_cache.json"), max_entries=2)
+    states = []
+    for y in range(3):
+        grid = [[[] for _ in range(3)] for _ in range(3)]
+        grid[0][y].append(Block("BABA", 0, y))
+        states.append(State(grid))
+
+    cache.put(states[0], STEP_FUNCTION, goal_validator, [Action.UP])
+    cache.put(states[1], STEP_FUNCTION, goal_validator, [Action.DOWN])
+    assert cache.get(states[0], STEP_FUNCTION, goal_validator) == [Action.UP]
+    cache.put(states[2], STEP_FUNCTION, goal_validator, [Action.LEFT])
+
+    assert len(cache) == 2
+    assert cache.get(states[1], STEP_FUNCTION, goal_validator) is None
+    assert cache.get(states[0], STEP_FUNCTION, goal_validator) == [Action.UP]
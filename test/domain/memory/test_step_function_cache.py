@@ -0,0 +1,66 @@
+import pytest
+
+from src.agent.modules.memory.memory import Memory
+from src.agent.modules.memory.step_function_cache import StepFunctionCache, step_function_cache
+from src.agent.state import Action, Block, Outcome, State
+
+STEP_FUNCTION = "def step(state, action):\n    return state\n"
+WINNING_STEP_FUNCTION = "def step(state, action):\n    state.outcome = Outcome.WIN\n    return state\n"
+
+
+def test_source_is_compiled_once():
+    cache = StepFunctionCache()
+
+    first = cache.get(STEP_FUNCTION)
+    assert cache.get(STEP_FUNCTION) is first
+    assert cache.get(WINNING_STEP_FUNCTION) is not first
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_functions_are_evicted():
+    cache = StepFunctionCache(max_entries=2)
+    first = cache.get(STEP_FUNCTION)
+    cache.get(WINNING_STEP_FUNCTION)
+    cache.get(STEP_FUNCTION)
+    cache.get("def step(state, action):\n    return None\n")
+
+    assert len(cache) == 2
+    assert cache.get(STEP_FUNCTION) is first
+    assert cache.misses == 3
+
+
+def test_broken_source_is_not_cached():
+    cache = StepFunctionCache()
+
+    with pytest.raises(SyntaxError):
+        cache.get("def step(state, action)\n")
+    assert len(cache) == 0
+
+
+def test_replacing_the_step_function_invalidates_the_compiled_one(tmp_path):
+    memory = Memory()
+    memory.step_function_path = str(tmp_path / "step_function.py")
+    memory.replace_step_function(STEP_FUNCTION)
+    unchanged = memory.get_compiled_step_function()
+    assert memory.get_compiled_step_function() is unchanged
+
+    memory.replace_step_function(WINNING_STEP_FUNCTION)
+    state = State([[[]]])
+    assert memory.get_compiled_step_function()(state, Action.STILL).outcome == Outcome.WIN
+    assert step_function_cache.get(WINNING_STEP_FUNCTION) is memory.get_compiled_step_function()
+
+
+def test_step_functions_can_call_the_helpers():
+    source = (
+        "def step(state, action):\n"
+        "    dx, dy = direction_of(action)\n"
+        "    for block in state.get_blocks_by_name('ROCK'):\n"
+        "        try_move(state, block, dx, dy)\n"
+        "    return state\n"
+    )
+    grid = [[[] for _ in range(3)]]
+    grid[0][0].append(Block("ROCK", 0, 0))
+
+    state = StepFunctionCache().get(source)(State(grid), Action.RIGHT)
+
+    assert [b.y for b in state.get_blocks_by_name("ROCK")] == [1]
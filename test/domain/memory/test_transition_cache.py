@@ -0,0 +1,53 @@
+from src.agent.modules.memory.transition_cache import TransitionCache
+from src.agent.state import Action
+
+
+def test_cached_transitions_match_the_step_function(load_state, load_step_function):
+    step = load_step_function("step_05.txt")
+    cache = TransitionCache()
+    state = load_state(0)
+
+    for action in Action:
+        assert cache.get(state, action, "v1") is None
+        cache.put(state, action, "v1", step(state.clone(), action))
+
+    for action in Action:
+        expected = step(state.clone(), action)
+        cached = cache.get(state, action, "v1")
+        assert cached == expected
+        assert cached.outcome == expected.outcome
+        assert cached.print_rules() == expected.print_rules()
+        # Every hit is a fresh copy the caller may mutate
+        assert cache.get(state, action, "v1") is not cached
+    assert (cache.hits, cache.misses) == (2 * len(Action), len(Action))
+
+
+def test_rules_and_step_function_are_part_of_the_key(load_state):
+    cache = TransitionCache()
+    state = load_state(0)
+    cache.put(state, Action.STILL, "v1", state.clone())
+
+    stale_rules = state.clone()
+    stale_rules.kind_to_properties = {}
+    stale_rules.kind_property_masks = {}
+    assert cache.get(stale_rules, Action.STILL, "v1") is None
+    assert cache.get(state, Action.STILL, "v1") is not None
+
+    # The same rules listed in another order are the same rules
+    reordered = state.clone()
+    reordered.kind_property_masks = dict(reversed(state.kind_property_masks.items()))
+    assert cache.get(reordered, Action.STILL, "v1") is not None
+
+    assert cache.get(state, Action.STILL, "v2") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_transitions_are_evicted(load_state):
+    cache = TransitionCache(max_entries=2)
+    state = load_state(0)
+    for action in (Action.UP, Action.DOWN, Action.UP, Action.LEFT):
+        cache.put(state, action, "v1", state)
+
+    assert len(cache) == 2
+    assert cache.get(state, Action.DOWN, "v1") is None
+    assert cache.get(state, Action.UP, "v1") is not None
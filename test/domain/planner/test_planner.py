@@ -1,9 +1,30 @@
+import itertools
+import multiprocessing
+import pathlib
+import pickle
+import random
+import time
+import types
+
 import pytest
 
+from src.agent.state import Action
+from src.agent.modules.core.planner.base import Planner
 from src.agent.modules.core.planner.bfs_planner import BFSPlanner
+from src.agent.modules.core.planner.budget import PlanStatus, SearchBudget
 from src.agent.modules.core.planner.iw_planner import IWPlanner
+from src.agent.modules.core.planner.heuristic_planner import HeuristicPlanner
+from src.agent.modules.core.planner.bfws_planner import BFWSPlanner
+from src.agent.modules.core.planner.parallel_bfs_planner import ParallelBFSPlanner
+from src.agent.modules.core.planner.portfolio_planner import PortfolioPlanner
+from src.agent.modules.core.planner.iddfs_planner import IDDFSPlanner
+from src.agent.modules.core.planner.beam_planner import BeamPlanner
+from src.agent.modules.core.planner.step_function import CompiledStepFunction
+from src.agent.modules.core.planner.heuristics import register_heuristic, get_heuristic
+from src.agent.modules.core.planner.novelty import NoveltyTable
 
 LEVEL_IDS = [0, 1, 2, 3, 4, 5, 6]
+STEP_DIR = pathlib.Path(__file__).parent / "data" / "step_functions"
 STEP_FUNCTION_NAME = 'step_05.txt'
 GOAL_VALIDATOR_NAME = 'default.txt'
 
@@ -28,4 +49,327 @@ def test_iw_reaches_goal(level_id, load_state, load_step_function, load_goal_val
     planner = IWPlanner(step_function, goal_validator)
     plan = planner.plan(state)
 
-    assert plan is not None
\ No newline at end of file
+    assert plan is not None
+
+@pytest.mark.parametrize("level_id, max_depth", [(0, 9), (5, 12)])
+def test_bfs_compact_frontier_matches_plain_frontier(level_id, max_depth, load_state, load_step_function, load_goal_validator):
+    state = load_state(level_id)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    plain = BFSPlanner(step_function, goal_validator).search(state, max_depth=max_depth)
+    compact = BFSPlanner(step_function, goal_validator, compact_frontier=True).search(state, max_depth=max_depth)
+
+    assert compact.status == plain.status
+    assert compact.plan == plain.plan
+    assert compact.stats.expanded == plain.stats.expanded
+
+
+def test_goal_condition_receives_full_trajectory(load_state, load_step_function):
+    state = load_state(0)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    wanted = [Action.RIGHT, Action.RIGHT]
+
+    def goal_validator(trajectory, current_state):
+        assert len(trajectory) == len(list(trajectory))
+        return [action for _, action in trajectory] == wanted
+
+    assert BFSPlanner(step_function, goal_validator).plan(state, max_depth=3) == wanted
+    assert IWPlanner(step_function, goal_validator).plan(state, max_depth=3) == wanted
+
+
+@pytest.mark.parametrize("mode", HeuristicPlanner.MODES)
+@pytest.mark.parametrize("level_id", [0, 5])
+def test_heuristic_planner_reaches_goal(level_id, mode, load_state, load_step_function, load_goal_validator):
+    state = load_state(level_id)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    planner = HeuristicPlanner(step_function, goal_validator, mode=mode)
+    plan = planner.plan(state, max_depth=40)
+
+    assert plan is not None
+    for action in plan:
+        state = step_function(state.clone(), action)
+    assert goal_validator([], state)
+
+
+def test_astar_expands_an_order_of_magnitude_fewer_nodes_than_bfs(load_state, load_step_function, load_goal_validator):
+    state = load_state(0)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    calls = {"bfs": 0, "astar": 0}
+
+    def counting(name):
+        def step(state, action):
+            calls[name] += 1
+            return step_function(state, action)
+        return step
+
+    bfs_plan = BFSPlanner(counting("bfs"), goal_validator).plan(state, max_depth=10)
+    astar_plan = HeuristicPlanner(counting("astar"), goal_validator, mode="astar").plan(state, max_depth=10)
+
+    assert len(astar_plan) == len(bfs_plan)
+    assert calls["astar"] * 10 <= calls["bfs"]
+
+
+def test_custom_heuristics_can_be_registered(load_state, load_step_function, load_goal_validator):
+    @register_heuristic("test_flag_column")
+    def flag_column(state):
+        baba = state.kind_to_blocks["BABA"][0]
+        flag = state.kind_to_blocks["FLAG"][0]
+        return abs(flag.y - baba.y)
+
+    assert get_heuristic("test_flag_column") is flag_column
+    with pytest.raises(ValueError):
+        get_heuristic("no_such_heuristic")
+
+    planner = HeuristicPlanner(
+        load_step_function(STEP_FUNCTION_NAME),
+        load_goal_validator(GOAL_VALIDATOR_NAME),
+        heuristic="test_flag_column",
+        mode="gbfs",
+    )
+    assert planner.plan(load_state(0), max_depth=20) is not None
+
+
+@pytest.mark.parametrize("width", [1, 2, 3])
+def test_incremental_novelty_matches_full_enumeration(width):
+    rng = random.Random(width)
+    table = NoveltyTable(width)
+    seen = set()
+
+    def brute_force(atoms):
+        new = {tuple(sorted(c)) for c in itertools.combinations(atoms, width)} - seen
+        seen.update(new)
+        return bool(new)
+
+    parent = frozenset(rng.sample(range(30), 8))
+    assert table.check_and_register(table.atom_ids(parent)) == brute_force(parent)
+    for _ in range(300):
+        child = set(parent)
+        child.discard(rng.choice(sorted(child)))
+        child.add(rng.randrange(30))
+        child = frozenset(child)
+
+        expected = brute_force(child)
+        assert table.check_and_register(table.atom_ids(child), table.atom_ids(parent)) == expected
+        if expected:
+            parent = child
+
+
+def test_iw_exhausts_full_level_without_depth_limit(load_state, load_step_function, load_goal_validator):
+    state = load_state(1)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    # No WIN rule can be formed with this step function, so both widths run to completion
+    assert IWPlanner(step_function, goal_validator).plan(state) is None
+
+
+@pytest.mark.parametrize("mode", BFWSPlanner.MODES)
+def test_bfws_reaches_goal(mode, load_state, load_step_function, load_goal_validator):
+    state = load_state(0)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    planner = BFWSPlanner(step_function, goal_validator, mode=mode)
+    plan = planner.plan(state)
+
+    assert plan is not None
+    for action in plan:
+        state = step_function(state.clone(), action)
+    assert goal_validator([], state)
+
+
+def test_bfws_reaches_distant_goal(load_state, load_step_function, load_goal_validator):
+    state = load_state(5)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    planner = BFWSPlanner(step_function, goal_validator, goal_measures="you_to_win")
+    plan = planner.plan(state, max_depth=40)
+
+    assert plan is not None
+
+
+@pytest.mark.parametrize("level_id", [0, 1])
+def test_parallel_bfs_returns_serial_plan(level_id, load_state, load_step_function, load_goal_validator):
+    state = load_state(level_id)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    serial_plan = BFSPlanner(step_function, goal_validator).plan(state, max_depth=6)
+    parallel_plan = ParallelBFSPlanner(step_function, goal_validator, workers=2, min_parallel_layer=1).plan(
+        state, max_depth=6
+    )
+
+    assert parallel_plan == serial_plan
+
+
+@pytest.mark.parametrize("planner_class", [BFSPlanner, ParallelBFSPlanner])
+def test_bfs_expands_through_the_batch_transition_function(planner_class, load_state, load_step_function, load_goal_validator):
+    state = load_state(0)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+    batch_sizes = []
+
+    def batch_step(states, actions):
+        batch_sizes.append(len(states))
+        # STILL fails, and must be retried through the state transition function
+        next_states = [None if a == Action.STILL else step_function(s.clone(), a) for s, a in zip(states, actions)]
+        errors = [RuntimeError("still") if a == Action.STILL else None for a in actions]
+        return types.SimpleNamespace(states=next_states, errors=errors)
+
+    planner = planner_class(step_function, goal_validator, batch_transition_function=batch_step)
+    plan = planner.plan(state, max_depth=9)
+
+    assert plan == BFSPlanner(step_function, goal_validator).plan(state, max_depth=9)
+    assert batch_sizes and set(batch_sizes) == {len(Action)}
+
+
+def test_iddfs_finds_shortest_plan_on_a_single_state(load_state, load_step_function, load_goal_validator):
+    state = load_state(0)
+    before = state.canonical_key()
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    bfs_plan = BFSPlanner(step_function, goal_validator).plan(state, max_depth=9)
+    iddfs_plan = IDDFSPlanner(step_function, goal_validator).plan(state, max_depth=9)
+    # A step function returning fresh states instead of mutating its argument
+    cloning_plan = IDDFSPlanner(lambda s, a: step_function(s.clone(), a), goal_validator).plan(state, max_depth=9)
+
+    assert len(iddfs_plan) == len(bfs_plan)
+    assert cloning_plan == iddfs_plan
+    assert state.canonical_key() == before
+    for action in iddfs_plan:
+        state = step_function(state.clone(), action)
+    assert goal_validator([], state)
+
+
+@pytest.mark.parametrize("level_id", [0, 5])
+def test_beam_reaches_goal(level_id, load_state, load_step_function, load_goal_validator):
+    state = load_state(level_id)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    plan = BeamPlanner(step_function, goal_validator, beam_width=64).plan(state, max_depth=40)
+
+    assert plan is not None
+    for action in plan:
+        state = step_function(state.clone(), action)
+    assert goal_validator([], state)
+
+
+def test_beam_restarts_with_a_wider_beam(load_state, load_step_function, load_goal_validator):
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    narrow = BeamPlanner(step_function, goal_validator, beam_width=4)
+    widening = BeamPlanner(step_function, goal_validator, beam_width=4, restarts=2, widening=4)
+
+    assert narrow.plan(load_state(5), max_depth=40) is None
+    assert widening.plan(load_state(5), max_depth=40) is not None
+
+
+def test_beam_expands_at_most_its_width_per_depth(load_state, load_step_function, load_goal_validator):
+    planner = BeamPlanner(load_step_function(STEP_FUNCTION_NAME), load_goal_validator(GOAL_VALIDATOR_NAME), beam_width=4)
+
+    result = planner.search(load_state(1), max_depth=30)
+
+    assert result.status == PlanStatus.EXHAUSTED
+    assert result.stats.expanded <= 4 * 30 + 1
+
+
+def test_compiled_step_function_survives_pickling(load_state):
+    source = (STEP_DIR / STEP_FUNCTION_NAME).read_text()
+    step_function = CompiledStepFunction(source)
+    state = load_state(0)
+
+    expected = step_function(state.clone(), Action.RIGHT)
+    copy = pickle.loads(pickle.dumps(step_function))
+
+    assert copy(state.clone(), Action.RIGHT) == expected
+
+
+class _NeverEndingPlanner(Planner):
+    def _search(self, start_state, max_depth, monitor):
+        while True:
+            time.sleep(1)
+
+
+def test_portfolio_returns_first_plan_and_stops_other_members(load_state, load_step_function, load_goal_validator):
+    state = load_state(0)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+
+    planner = PortfolioPlanner(
+        step_function,
+        goal_validator,
+        members={"stuck": _NeverEndingPlanner, "astar": HeuristicPlanner},
+    )
+    start = time.monotonic()
+    plan = planner.plan(state, max_depth=10)
+
+    assert planner.winner == "astar"
+    assert len(plan) == 8
+    assert time.monotonic() - start < 10
+    assert not multiprocessing.active_children()
+
+
+def test_portfolio_gives_up_after_timeout(load_state, load_step_function, load_goal_validator):
+    planner = PortfolioPlanner(
+        load_step_function(STEP_FUNCTION_NAME),
+        load_goal_validator(GOAL_VALIDATOR_NAME),
+        members={"stuck": _NeverEndingPlanner},
+        timeout=0.5,
+    )
+
+    assert planner.plan(load_state(0)) is None
+    assert planner.winner is None
+
+
+@pytest.mark.parametrize(
+    "planner_class", [BFSPlanner, IWPlanner, HeuristicPlanner, BFWSPlanner, ParallelBFSPlanner, IDDFSPlanner, BeamPlanner]
+)
+def test_search_stops_at_node_budget_with_partial_plan(planner_class, load_state, load_step_function, load_goal_validator):
+    state = load_state(1)
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+    progress = []
+
+    result = planner_class(step_function, goal_validator).search(
+        state, budget=SearchBudget(max_nodes=50), progress_callback=progress.append
+    )
+
+    assert result.status == PlanStatus.NODE_LIMIT
+    assert result.plan is None
+    assert result.stats.expanded == 50
+    assert result.stats.generated >= 50
+    assert progress and progress[-1] is result.stats
+    for action in result.partial_plan:
+        state = step_function(state.clone(), action)
+
+
+def test_search_reports_solved_and_exhausted(load_state, load_step_function, load_goal_validator):
+    step_function = load_step_function(STEP_FUNCTION_NAME)
+    goal_validator = load_goal_validator(GOAL_VALIDATOR_NAME)
+    planner = BFSPlanner(step_function, goal_validator)
+
+    solved = planner.search(load_state(0), max_depth=10)
+    assert solved.status == PlanStatus.SOLVED
+    assert solved.plan == solved.partial_plan == planner.plan(load_state(0), max_depth=10)
+
+    exhausted = planner.search(load_state(1), max_depth=3)
+    assert exhausted.status == PlanStatus.EXHAUSTED
+    assert exhausted.plan is None
+
+
+def test_search_stops_at_deadline(load_state, load_step_function, load_goal_validator):
+    planner = BFSPlanner(load_step_function(STEP_FUNCTION_NAME), load_goal_validator(GOAL_VALIDATOR_NAME))
+
+    result = planner.search(load_state(1), budget=SearchBudget(time_limit=0.2))
+
+    assert result.status == PlanStatus.TIME_LIMIT
+    assert result.stats.elapsed < 5
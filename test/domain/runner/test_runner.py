@@ -0,0 +1,100 @@
+import pytest
+
+from src.agent.modules.core.runner import Runner
+from src.agent.state import Action
+
+
+class LLMClientStub:
+    """Fails the test if the Runner asks for a new step function."""
+
+    def get_instruct_completion(self, **kwargs):
+        raise AssertionError("Unexpected step function update")
+
+
+class MemoryStub:
+    """Serves a single step function version and counts the calls made to it."""
+
+    def __init__(self, step_function):
+        self._step = step_function
+        self.calls = 0
+
+    def get_step_function_hash(self) -> str:
+        return "stub"
+
+    def get_compiled_step_function(self):
+        def step(state, action):
+            self.calls += 1
+            return self._step(state, action)
+
+        return step
+
+
+def test_cache_hits_skip_the_step_function(load_state, load_step_function):
+    memory = MemoryStub(load_step_function("step_05.txt"))
+    runner = Runner(LLMClientStub(), memory)
+    state = load_state(0)
+
+    first = runner.run(state, Action.RIGHT)
+    second = runner.run(state, Action.RIGHT)
+    assert memory.calls == 1
+    assert (runner.transition_cache.hits, runner.transition_cache.misses) == (1, 1)
+    assert second == first and second is not first
+
+    # Mutating a result must not leak into the cached transition
+    second.remove_block(second.get_blocks_by_property("YOU")[0])
+    assert runner.run(state, Action.RIGHT) == first
+    assert memory.calls == 1
+
+
+def test_batch_results_are_aligned_with_the_inputs(load_state, load_step_function):
+    step = load_step_function("step_05.txt")
+    runner = Runner(LLMClientStub(), MemoryStub(step))
+    states = [load_state(0), load_state(1), load_state(0)]
+    actions = [Action.RIGHT, Action.UP, Action.LEFT]
+
+    result = runner.run_batch(states, actions)
+    assert len(result) == 3 and result.failed == []
+    for state, action, next_state, outcome in zip(states, actions, result.states, result.outcomes):
+        expected = step(state.clone(), action)
+        assert next_state == expected
+        assert outcome == expected.outcome
+
+    with pytest.raises(ValueError):
+        runner.run_batch(states, actions[:2])
+
+
+def test_batch_errors_stay_with_their_item(load_state, load_step_function):
+    step = load_step_function("step_05.txt")
+
+    def step_failing_up(state, action):
+        if action == Action.UP:
+            raise RuntimeError("cannot go up")
+        return step(state, action)
+
+    runner = Runner(LLMClientStub(), MemoryStub(step_failing_up))
+    state = load_state(0)
+
+    result = runner.run_batch([state] * len(Action), list(Action))
+    assert result.failed == [list(Action).index(Action.UP)]
+    for action, next_state, error in zip(Action, result.states, result.errors):
+        if action == Action.UP:
+            assert next_state is None and isinstance(error, RuntimeError)
+        else:
+            assert next_state == step(state.clone(), action) and error is None
+    # Failures are not cached, the next batch tries them again
+    assert len(runner.transition_cache) == len(Action) - 1
+
+
+def test_batch_reuses_cached_transitions(load_state, load_step_function):
+    memory = MemoryStub(load_step_function("step_05.txt"))
+    runner = Runner(LLMClientStub(), memory)
+    state = load_state(0)
+
+    single = runner.run(state, Action.RIGHT)
+    result = runner.run_batch([state] * len(Action), list(Action))
+    assert memory.calls == len(Action)
+    assert result.states[list(Action).index(Action.RIGHT)] == single
+
+    again = runner.run_batch([state] * len(Action), list(Action))
+    assert memory.calls == len(Action)
+    assert again.states == result.states
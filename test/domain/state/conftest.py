@@ -0,0 +1,41 @@
+import pytest
+
+from src.agent.state import State, Block
+
+
+@pytest.fixture
+def debug_indexes(monkeypatch):
+    monkeypatch.setattr(State, "debug_indexes", True)
+
+
+@pytest.fixture
+def make_state():
+    def _make(rules: list[str], blocks: dict[tuple[int, int], list[str]], width: int = 8) -> State:
+        """Spell each rule on its own row below an empty top row, then place `blocks` below them."""
+        grid = [[[] for _ in range(width)] for _ in range(len(rules) + 5)]
+        for x, rule in enumerate(rules, start=1):
+            for y, word in enumerate(rule.split()):
+                grid[x][y].append(Block(f"TEXT_{word}", x, y))
+        for (x, y), cell in blocks.items():
+            grid[x][y].extend(Block(kind, x, y) for kind in cell)
+        return State(grid)
+
+    return _make
+
+
+@pytest.fixture
+def make_row():
+    def _make(*cells: str, rules: tuple[str, ...] = ("BABA IS YOU", "ROCK IS PUSH", "WALL IS STOP")) -> State:
+        """One row of `cells` ("" for empty) under one row per rule."""
+        width = max(len(cells), 3)
+        grid = [[[] for _ in range(width)] for _ in range(len(rules) + 1)]
+        for x, rule in enumerate(rules):
+            for y, word in enumerate(rule.split()):
+                grid[x][y].append(Block(f"TEXT_{word}", x, y))
+        row = len(rules)
+        for y, kind in enumerate(cells):
+            if kind:
+                grid[row][y].append(Block(kind, row, y))
+        return State(grid)
+
+    return _make
@@ -0,0 +1,100 @@
+import random
+
+from src.agent.state import State, Action, Outcome
+from src.agent.state.reference_engine import reference_step, first_divergence
+
+def kinds_at(state: State, x: int, y: int) -> list[str]:
+    return sorted(b.kind for b in state.grid[x][y])
+
+
+def test_you_pushes_a_chain_until_it_meets_stop(debug_indexes, make_state):
+    state = make_state(
+        ["BABA IS YOU", "ROCK IS PUSH", "WALL IS STOP"],
+        {(4, 0): ["BABA"], (4, 1): ["ROCK"], (4, 2): ["ROCK"], (4, 4): ["WALL"]},
+    )
+
+    state = reference_step(state, Action.RIGHT)
+    assert kinds_at(state, 4, 1) == ["BABA"]
+    assert kinds_at(state, 4, 3) == ["ROCK"]
+
+    state = reference_step(state, Action.RIGHT)
+    assert kinds_at(state, 4, 1) == ["BABA"]
+    assert kinds_at(state, 4, 3) == ["ROCK"]
+    assert state.outcome == Outcome.ONGOING
+
+
+def test_pushing_text_changes_the_rules(debug_indexes, make_state):
+    # Pushing "YOU" out of "BABA IS YOU" leaves nothing to control
+    state = make_state(["BABA IS YOU"], {(0, 2): ["BABA"]})
+
+    state = reference_step(state, Action.DOWN)
+    assert kinds_at(state, 2, 2) == ["TEXT_YOU"]
+
+    assert state.get_blocks_by_property("YOU") == []
+    assert state.outcome == Outcome.LOSE
+
+
+def test_win_defeat_sink_and_melt(debug_indexes, make_state):
+    rules = ["BABA IS YOU", "FLAG IS WIN", "SKULL IS DEFEAT", "WATER IS SINK", "LAVA IS HOT", "ROCK IS MELT"]
+
+    won = reference_step(make_state(rules, {(7, 0): ["BABA"], (7, 1): ["FLAG"]}), Action.RIGHT)
+    assert won.outcome == Outcome.WIN
+
+    lost = reference_step(make_state(rules, {(7, 0): ["BABA"], (7, 1): ["SKULL"]}), Action.RIGHT)
+    assert lost.outcome == Outcome.LOSE
+    assert kinds_at(lost, 7, 1) == ["SKULL"]
+
+    sunk = reference_step(make_state(rules, {(7, 0): ["BABA"], (8, 0): ["ROCK", "WATER"], (8, 3): ["ROCK", "LAVA"]}), Action.STILL)
+    assert kinds_at(sunk, 8, 0) == []
+    assert kinds_at(sunk, 8, 3) == ["LAVA"]
+
+
+def test_outcome_is_recomputed_every_turn(debug_indexes, make_state):
+    rules = ["BABA IS YOU", "FLAG IS WIN"]
+    state = reference_step(make_state(rules, {(4, 0): ["BABA"], (4, 1): ["FLAG"]}), Action.RIGHT)
+    assert state.outcome == Outcome.WIN
+
+    state = reference_step(state, Action.RIGHT)
+    assert state.outcome == Outcome.ONGOING
+
+
+def test_open_destroys_shut(debug_indexes, make_state):
+    state = make_state(
+        ["BABA IS YOU", "KEY IS OPEN", "KEY IS PUSH", "DOOR IS SHUT", "DOOR IS STOP"],
+        {(7, 0): ["BABA"], (7, 1): ["KEY"], (7, 2): ["DOOR"], (8, 0): ["DOOR"]},
+    )
+
+    # BABA itself is not OPEN, a door stops it
+    state = reference_step(state, Action.DOWN)
+    assert kinds_at(state, 7, 0) == ["BABA"]
+
+    # The pushed key opens the door, both disappear
+    state = reference_step(state, Action.RIGHT)
+    assert kinds_at(state, 7, 1) == []
+    assert kinds_at(state, 7, 2) == []
+
+
+def test_nouns_swap_through_transformation_rules(debug_indexes, make_state):
+    state = make_state(
+        ["BABA IS YOU", "ROCK IS FLAG", "FLAG IS ROCK", "WALL IS TEXT"],
+        {(5, 0): ["BABA"], (5, 2): ["ROCK"], (5, 4): ["FLAG"], (5, 6): ["WALL"]},
+    )
+
+    state = reference_step(state, Action.STILL)
+
+    assert kinds_at(state, 5, 2) == ["FLAG"]
+    assert kinds_at(state, 5, 4) == ["ROCK"]
+    assert kinds_at(state, 5, 6) == ["TEXT_WALL"]
+
+
+def test_reference_engine_agrees_with_learned_step_function_on_level_0(load_step_function, load_state):
+    step = load_step_function("step_05.txt")
+    state = load_state(0)
+    rng = random.Random(0)
+    actions = [rng.choice(list(Action)) for _ in range(30)]
+
+    assert first_divergence(step, state, actions) is None
+    assert first_divergence(step, state, [Action.RIGHT] * 8) is None
+    for action in [Action.RIGHT] * 8:
+        state = reference_step(state.clone(), action)
+    assert state.outcome == Outcome.WIN
@@ -0,0 +1,459 @@
+import copy
+import pickle
+import random
+import sys
+from array import array
+
+import pytest
+
+from src.agent.state import State, Block, Action, Outcome, PackedState
+from src.agent.state.packed_state import _KIND_MASK
+from src.agent.state.block_type import kinds, property_mask, NOUN, TEXT_NOUN, VERB, PROPERTY, TEXT, TEXT_IS
+from src.agent.utils.prompt_utils import format_tile_diffs
+
+LEVEL_IDS = [0, 1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_kind_index_matches_full_recompute(level_id, debug_indexes, load_state):
+    state = load_state(level_id)
+
+    for block in state.get_blocks_by_property("YOU"):
+        nx = min(block.x + 1, len(state.grid) - 1)
+        state.move_block(block, nx, block.y)
+
+    rock = Block("ROCK", 0, 0)
+    state.add_block(rock)
+    state.move_block(rock, 1, 1)
+    state.remove_block(rock)
+
+    for kind in list(state.kind_to_blocks):
+        for block in state.get_blocks_by_name(kind)[:1]:
+            state.remove_block(block)
+
+    state.check_indexes()
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_incremental_rules_match_full_reparse(level_id, debug_indexes, load_state):
+    state = load_state(level_id)
+
+    text_blocks = [b for kind, blocks in state.kind_to_blocks.items() if kind.startswith("TEXT_") for b in blocks]
+    for block in text_blocks[::2]:
+        state.move_block(block, block.x, max(block.y - 1, 0))
+    state.remove_block(text_blocks[1])
+    state.refresh_rules()
+
+    state.check_rules()
+
+
+def test_refresh_rules_skips_when_no_text_moved(load_state):
+    state = load_state(0)
+    rules_before = state.kind_to_properties
+
+    baba = state.get_blocks_by_name("BABA")[0]
+    state.move_block(baba, baba.x, baba.y + 1)
+    state.refresh_rules()
+
+    assert state.kind_to_properties is rules_before
+
+
+def test_breaking_a_rule_removes_it(load_state):
+    state = load_state(0)
+    assert "YOU" in state.kind_to_properties["BABA"]
+
+    text_you = state.get_blocks_by_name("TEXT_YOU")[0]
+    state.move_block(text_you, text_you.x + 1, text_you.y)
+    state.refresh_rules()
+
+    assert "YOU" not in state.kind_to_properties.get("BABA", [])
+    assert state.get_blocks_by_property("YOU") == []
+
+
+def test_hash_and_equality_ignore_order_within_cell(load_state):
+    state = load_state(0)
+    other = load_state(0)
+    cell = other.get_blocks_in_cell(6, 11)
+    other.add_block(Block("ROCK", 6, 11))
+    cell.reverse()
+    grid_before = [[list(cell) for cell in row] for row in other.grid]
+
+    state.add_block(Block("ROCK", 6, 11))
+
+    assert hash(state) == hash(other)
+    assert state == other
+    assert other.grid == grid_before
+
+
+
+def test_tile_diffs_ignore_order_within_cell(load_state):
+    previous = load_state(0)
+    simulated = load_state(0)
+    real = load_state(0)
+    simulated.add_block(Block("ROCK", 6, 11))
+    real.add_block(Block("ROCK", 6, 11))
+    real.get_blocks_in_cell(6, 11).reverse()
+    assert [b.kind for b in simulated.grid[6][11]] != [b.kind for b in real.grid[6][11]]
+
+    assert format_tile_diffs(previous, simulated, real) == ""
+
+    real.add_block(Block("WALL", 6, 11))
+    assert format_tile_diffs(previous, simulated, real).startswith("Differences at X=6,Y=11:")
+
+def test_hash_distinguishes_stacked_duplicates(load_state):
+    state = load_state(0)
+    once = load_state(0)
+    once.add_block(Block("ROCK", 1, 1))
+    state.add_block(Block("ROCK", 1, 1))
+    state.add_block(Block("ROCK", 1, 1))
+
+    assert hash(state) != hash(once)
+    assert state != once
+
+
+def test_hash_follows_moves(debug_indexes, load_state):
+    state = load_state(0)
+    original_hash = hash(state)
+
+    baba = state.get_blocks_by_name("BABA")[0]
+    state.move_block(baba, baba.x, baba.y + 1)
+    assert hash(state) != original_hash
+    assert state != load_state(0)
+
+    state.move_block(baba, baba.x, baba.y - 1)
+    assert hash(state) == original_hash
+    assert state == load_state(0)
+
+
+@pytest.mark.parametrize("level_id", [0, 1, 3, 5])
+def test_clone_matches_deepcopy_and_leaves_parent_untouched(level_id, debug_indexes, load_step_function, load_state):
+    step = load_step_function("step_05.txt")
+    rng = random.Random(level_id)
+    actions = list(Action)
+
+    cloned = load_state(level_id)
+    copied = copy.deepcopy(cloned)
+    for _ in range(40):
+        action = rng.choice(actions)
+        parent_snapshot = copy.deepcopy(cloned)
+
+        next_cloned = step(cloned.clone(), action)
+        copied = step(copy.deepcopy(copied), action)
+
+        assert cloned == parent_snapshot
+        assert cloned.canonical_key() == parent_snapshot.canonical_key()
+        assert next_cloned == copied
+        assert next_cloned.outcome == copied.outcome
+        next_cloned.check_indexes()
+        cloned = next_cloned
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (Outcome, type)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_packed_state_round_trip(level_id, load_state):
+    state = load_state(level_id)
+    baba = state.get_blocks_by_property("YOU")[0]
+    state.add_block(Block(baba.kind, baba.x, baba.y))
+    state.outcome = Outcome.LOSE
+
+    packed = PackedState.from_state(state)
+    unpacked = packed.unpack()
+
+    assert unpacked == state
+    assert hash(unpacked) == hash(state) == hash(packed)
+    assert unpacked.outcome == Outcome.LOSE
+    assert unpacked.kind_to_properties == state.kind_to_properties
+    assert packed == PackedState.from_state(unpacked)
+    for x, y in [(baba.x, baba.y), (0, 0)]:
+        assert sorted(packed.get_blocks_in_cell(x, y), key=repr) == sorted(state.get_blocks_in_cell(x, y), key=repr)
+    for prop in ["YOU", "STOP", "PUSH", "WIN"]:
+        assert sorted(packed.get_blocks_by_property(prop), key=repr) == sorted(state.get_blocks_by_property(prop), key=repr)
+
+
+def test_packed_state_pickles_re_encode_foreign_kind_ids(load_state):
+    packed = PackedState.from_state(load_state(0))
+    assert pickle.loads(pickle.dumps(packed)) == packed
+
+    # As pickled by a process that interned the same kinds in reverse order
+    unpickle, args = packed.__reduce__()
+    width, height, kind_names, cells, *rest = args
+    foreign = {kind_id: _KIND_MASK - kind_id for kind_id in kind_names}
+    foreign_cells = array("I", sorted((e & ~_KIND_MASK) | foreign[e & _KIND_MASK] for e in cells))
+    foreign_names = {foreign[kind_id]: name for kind_id, name in kind_names.items()}
+    assert unpickle(width, height, foreign_names, foreign_cells, *rest) == packed
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_packed_state_is_at_least_five_times_smaller(level_id, load_state):
+    state = load_state(level_id)
+    packed = PackedState.from_state(state)
+
+    state_size = deep_sizeof(state) - deep_sizeof(state.kind_to_properties) - deep_sizeof(state.property_to_kinds)
+    assert packed.nbytes() * 5 <= state_size
+
+
+def test_kind_registry_ids_and_flags():
+    baba, text_baba, text_you = kinds.id_of("BABA"), kinds.id_of("TEXT_BABA"), kinds.id_of("TEXT_YOU")
+
+    assert kinds.id_of("BABA") == baba
+    assert kinds.name_of(text_baba) == "TEXT_BABA"
+    assert kinds.flags_of(baba) == NOUN
+    assert kinds.flags_of(text_baba) == TEXT_NOUN | TEXT
+    assert kinds.flags_of(text_you) == PROPERTY | TEXT
+    assert kinds.flags_of(TEXT_IS) == VERB | TEXT
+    assert kinds.references_to(text_baba) == baba
+    assert kinds.name_of(kinds.references_to(text_you)) == "YOU"
+
+    renamed = kinds.id_of("TEXT_CHARACTER")
+    assert kinds.flags_of(renamed) == TEXT
+    assert kinds.get("NOT_A_KIND") is None
+
+
+def test_property_mask_ignores_unknown_names():
+    known = len(kinds)
+    assert property_mask("push") == property_mask("PSUH") == 0
+    assert property_mask("PUSH", "push") == property_mask("PUSH") != 0
+    assert len(kinds) == known
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_property_masks_agree_with_property_lists(level_id, load_state):
+    state = load_state(level_id)
+
+    for blocks in state.kind_to_blocks.values():
+        for block in blocks:
+            props = state.get_properties_of_block(block)
+            assert state.get_property_mask(block) == property_mask(*props)
+            for prop in ["YOU", "STOP", "PUSH", "WIN", "DEFEAT", "SINK"]:
+                assert state.has_property(block, prop) == (prop in props)
+
+
+def test_cell_property_mask_combines_blocks(load_state):
+    state = load_state(0)
+    rock = state.get_blocks_by_name("ROCK")[0]
+    state.add_block(Block("WALL", rock.x, rock.y))
+
+    mask = state.cell_property_mask(rock.x, rock.y)
+    assert mask & property_mask("PUSH")
+    assert mask & property_mask("STOP")
+    assert not mask & property_mask("YOU", "WIN")
+    assert state.cell_property_mask(0, 0) == 0
+
+
+def test_property_queries_ignore_case(load_state):
+    state = load_state(0)
+    rock = state.get_blocks_by_name("ROCK")[0]
+
+    assert state.has_property(rock, "push") and state.has_property(rock, "Push")
+    assert state.cell_has_property(rock.x, rock.y, "push")
+    assert state.blocks_at_with_property(rock.x, rock.y, "push") == [rock]
+    assert not state.cell_has_property(rock.x, rock.y, "stop")
+    assert state.get_blocks_by_property("push") == state.get_blocks_by_property("PUSH")
+    assert rock in state.get_blocks_by_property("push")
+
+
+def test_spatial_property_queries_follow_moves_and_rules(debug_indexes, load_state):
+    state = load_state(0)
+    rock = state.get_blocks_by_name("ROCK")[0]
+    x, y = rock.x, rock.y
+
+    assert state.cell_has_property(x, y, "PUSH")
+    assert state.blocks_at_with_property(x, y, "PUSH") == [rock]
+    assert state.blocks_at_with_property(x, y, "STOP") == []
+    assert not state.cell_has_property(-1, 0, "PUSH")
+    assert state.blocks_at_with_property(len(state.grid), 0, "PUSH") == []
+
+    child = state.clone()
+    child_rock = child.blocks_at_with_property(x, y, "PUSH")[0]
+    child.move_block(child_rock, x, y + 1)
+    assert not child.cell_has_property(x, y, "PUSH")
+    assert child.cell_has_property(x, y + 1, "PUSH")
+    assert state.cell_has_property(x, y, "PUSH")
+
+    text_push = child.get_blocks_by_name("TEXT_PUSH")[0]
+    child.move_block(text_push, text_push.x + 1, text_push.y)
+    child.refresh_rules()
+    assert not child.cell_has_property(x, y + 1, "PUSH")
+    assert state.cell_has_property(x, y, "PUSH")
+    child.check_indexes()
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_snapshot_round_trip(level_id, load_state, state_file):
+    state = load_state(level_id)
+    baba = state.get_blocks_by_property("YOU")[0]
+    state.add_block(Block("ROCK", baba.x, baba.y))
+    state.outcome = Outcome.WIN
+
+    data = state.to_bytes()
+    loaded = State.from_bytes(data)
+
+    assert loaded == state
+    assert hash(loaded) == hash(state)
+    assert loaded.outcome == Outcome.WIN
+    assert loaded.kind_to_properties == state.kind_to_properties
+    assert [[[b.kind for b in cell] for cell in row] for row in loaded.grid] == [
+        [[b.kind for b in cell] for cell in row] for row in state.grid
+    ]
+    assert len(data) < len(state_file(level_id).read_text()) / 4
+
+
+def test_snapshot_handles_long_empty_runs():
+    grid = [[[] for _ in range(300)] for _ in range(300)]
+    grid[0][0].append(Block("BABA", 0, 0))
+    grid[299][299].append(Block("FLAG", 299, 299))
+    state = State(grid)
+
+    assert State.from_bytes(state.to_bytes()) == state
+
+
+def test_snapshot_rejects_other_data():
+    with pytest.raises(ValueError):
+        State.from_bytes(b"NOPE" + bytes(20))
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_grid_string_round_trip(level_id, load_state):
+    state = load_state(level_id)
+
+    assert State.from_grid_string(str(state)) == state
+
+
+@pytest.mark.parametrize("level_id", LEVEL_IDS)
+def test_active_region_covers_blocks_and_their_neighbours(level_id, load_state):
+    state = load_state(level_id)
+    x_min, y_min, x_stop, y_stop = state.active_region
+
+    for blocks in state.kind_to_blocks.values():
+        for b in blocks:
+            for dx, dy in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+                x, y = b.x + dx, b.y + dy
+                if state.in_bounds(x, y):
+                    assert x_min <= x < x_stop and y_min <= y < y_stop
+    assert (x_stop - x_min) * (y_stop - y_min) <= len(state.grid) * len(state.grid[0])
+
+
+def test_active_region_follows_mutations(debug_indexes):
+    grid = [[[] for _ in range(20)] for _ in range(20)]
+    grid[5][5].append(Block("BABA", 5, 5))
+    grid[8][9].append(Block("FLAG", 8, 9))
+    state = State(grid)
+    assert state.active_region == (4, 4, 10, 11)
+
+    state.move_block(state.get_blocks_by_name("FLAG")[0], 8, 12)
+    assert state.active_region == (4, 4, 10, 14)
+
+    child = state.clone()
+    child.remove_block(child.get_blocks_by_name("FLAG")[0])
+    assert child.active_region == (4, 4, 7, 7)
+    assert state.active_region == (4, 4, 10, 14)
+
+    child.add_block(Block("ROCK", 19, 0))
+    assert child.active_region == (4, 0, 20, 7)
+
+
+def layout(state: State):
+    """Everything rollback must restore, including the order of blocks in cells and kind lists."""
+    return (
+        [[[b.kind for b in cell] for cell in row] for row in state.grid],
+        {kind: [(b.x, b.y) for b in blocks] for kind, blocks in state.kind_to_blocks.items()},
+        state.zobrist_hash,
+        state.kind_to_properties,
+        state.outcome,
+    )
+
+
+@pytest.mark.parametrize("level_id", [0, 1, 3, 5])
+def test_rollback_restores_the_state_in_place(level_id, debug_indexes, load_step_function, load_state):
+    step = load_step_function("step_05.txt")
+    rng = random.Random(level_id)
+    actions = list(Action)
+    state = load_state(level_id)
+
+    # Random walk applying nested checkpoints, undoing some of them on the way
+    snapshots = []
+    for _ in range(60):
+        if snapshots and rng.random() < 0.4:
+            state.rollback()
+            assert layout(state) == snapshots.pop()
+            continue
+        snapshots.append(layout(state))
+        state.checkpoint()
+        assert step(state, rng.choice(actions)) is state
+
+    while snapshots:
+        state.rollback()
+        assert layout(state) == snapshots.pop()
+    assert state._journal is None
+
+
+def test_rollback_restores_rules_and_outcome(debug_indexes, load_state):
+    state = load_state(0)
+    before = layout(state)
+    rules = state.print_rules()
+
+    state.checkpoint()
+    text_is = state.get_blocks_by_name("TEXT_IS")[0]
+    state.remove_block(text_is)
+    state.add_block(Block("ROCK", text_is.x, text_is.y))
+    state.refresh_rules()
+    state.outcome = Outcome.LOSE
+    assert state.print_rules() != rules
+
+    state.rollback()
+    assert layout(state) == before
+    assert state.print_rules() == rules
+    state.check_rules()
+
+
+def test_commit_keeps_changes_until_the_enclosing_rollback(load_state):
+    state = load_state(0)
+    before = layout(state)
+    you = state.get_blocks_by_property("YOU")[0]
+
+    state.checkpoint()
+    state.checkpoint()
+    state.move_block(you, you.x, you.y + 1)
+    state.commit()
+    assert layout(state) != before
+
+    state.rollback()
+    assert layout(state) == before
+    with pytest.raises(RuntimeError):
+        state.rollback()
+
+
+def test_rollback_after_cloning_mid_journal(debug_indexes):
+    grid = [[[] for _ in range(3)] for _ in range(3)]
+    grid[0][0].append(Block("ROCK", 0, 0))
+    grid[1][1].append(Block("FLAG", 1, 1))
+    state = State(grid)
+    before = layout(state)
+
+    state.checkpoint()
+    state.remove_block(state.get_blocks_by_name("FLAG")[0])
+    state.move_block(state.get_blocks_by_name("ROCK")[0], 0, 1)
+    state.add_block(Block("ROCK", 1, 2))
+    state.add_block(Block("ROCK", 0, 2))
+    state.move_block(state.get_blocks_in_cell(0, 1)[0], 0, 2)
+    # Cloning replaces the blocks of every cell the state touches from now on
+    child = state.clone()
+    after = layout(child)
+
+    state.rollback()
+    assert layout(state) == before
+    assert layout(child) == after
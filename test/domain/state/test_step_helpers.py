@@ -0,0 +1,52 @@
+from src.agent.state import State, Action
+from src.agent.state.step_helpers import (
+    blocks_in_cell_with_property,
+    direction_of,
+    move_blocks,
+    push_chain,
+    try_move,
+)
+
+
+def kinds_of_row(state: State) -> list[str]:
+    return [",".join(b.kind for b in cell) for cell in state.grid[-1]]
+
+
+def test_push_chain_collects_pushed_blocks_nearest_first(make_row):
+    state = make_row("BABA", "ROCK", "ROCK", "", "WALL")
+    baba = state.get_blocks_by_name("BABA")[0]
+    dx, dy = direction_of(Action.RIGHT)
+
+    assert [b.y for b in push_chain(state, baba, dx, dy)] == [1, 2]
+    assert push_chain(state, baba, *direction_of(Action.LEFT)) is None
+
+
+def test_push_chain_is_blocked_by_stop_and_the_grid_edge(make_row):
+    for state in (make_row("BABA", "ROCK", "WALL"), make_row("", "BABA", "ROCK")):
+        assert push_chain(state, state.get_blocks_by_name("BABA")[0], 0, 1) is None
+
+
+def test_try_move_moves_the_whole_chain_or_nothing(debug_indexes, make_row):
+    state = make_row("BABA", "ROCK", "ROCK", "", "WALL")
+    baba = state.get_blocks_by_name("BABA")[0]
+
+    assert try_move(state, baba, 0, 1)
+    assert kinds_of_row(state) == ["", "BABA", "ROCK", "ROCK", "WALL"]
+    assert not try_move(state, baba, 0, 1)
+    assert kinds_of_row(state) == ["", "BABA", "ROCK", "ROCK", "WALL"]
+
+
+def test_move_blocks_moves_each_block_once(debug_indexes, make_row):
+    state = make_row("ROCK", "", "")
+    rock = state.get_blocks_by_name("ROCK")[0]
+
+    move_blocks(state, [rock, rock], 0, 1)
+
+    assert kinds_of_row(state) == ["", "ROCK", ""]
+
+
+def test_property_names_are_case_insensitive(make_row):
+    state = make_row("BABA", "ROCK")
+
+    assert blocks_in_cell_with_property(state, len(state.grid) - 1, 1, "push") == state.get_blocks_by_name("ROCK")
+    assert blocks_in_cell_with_property(state, -1, 1, "push") == []